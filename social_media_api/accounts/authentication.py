@@ -0,0 +1,168 @@
+# accounts/authentication.py
+"""
+Token authentication over AuthToken (hashed, expiring keys) with a cache in
+front of the token + user query.
+
+- The header carries the raw key; everything else (database, caches) only
+  ever sees its SHA-256 digest
+- Per-process LRU: AUTH_TOKEN_CACHE_SIZE entries (10000), each trusted for
+  AUTH_TOKEN_CACHE_TTL seconds (30)
+- Optional shared Django cache (AUTH_TOKEN_CACHE_ALIAS, off by default) so
+  workers warm each other and see each other's invalidations
+- Entries are dropped explicitly (accounts/signals.py) when a token is deleted
+  (logout, rotation), when a user is saved or deleted (deactivation, profile
+  edits) and when follow counters move; another process's LRU can still serve
+  an invalidated entry until its TTL runs out, so keep the TTL short
+- Every request gets its own copy of the cached user
+- Keys from the old rest_framework.authtoken table are converted on first
+  use (AuthToken.upgrade_legacy), so they keep working after the switch
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .models import AuthToken
+
+
+def cache_ttl():
+    return getattr(settings, "AUTH_TOKEN_CACHE_TTL", 30)
+
+
+def _shared_cache():
+    alias = getattr(settings, "AUTH_TOKEN_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _token_cache_key(key_hash):
+    return f"auth:token:{key_hash}"
+
+
+def _user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class LRUTokenCache:
+    """Bounded key hash -> (user, token) map with per-entry expiry and a user index."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key hash -> (expires_at, user, token)
+        self.keys_by_user = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, user, token, ttl):
+        maxsize = getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000)
+        with self.lock:
+            self._pop(key)
+            self.entries[key] = (time.monotonic() + ttl, user, token)
+            self.keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self.entries) > maxsize:
+                self._pop(next(iter(self.entries)))
+
+    def discard(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def discard_users(self, user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                for key in list(self.keys_by_user.get(user_id, ())):
+                    self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_user.clear()
+
+    def _pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            keys = self.keys_by_user.get(entry[1].pk)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_user[entry[1].pk]
+
+
+local_cache = LRUTokenCache()
+
+
+def get_cached(key_hash):
+    cached = local_cache.get(key_hash)
+    if cached is None:
+        shared = _shared_cache()
+        if shared is not None:
+            cached = shared.get(_token_cache_key(key_hash))
+            if cached is not None:
+                local_cache.set(key_hash, *cached, cache_ttl())
+    return cached
+
+
+def remember(key_hash, user, token):
+    ttl = cache_ttl()
+    local_cache.set(key_hash, user, token, ttl)
+    shared = _shared_cache()
+    if shared is not None:
+        cache_key = _token_cache_key(key_hash)
+        shared.set(cache_key, (user, token), ttl)
+        user_key = _user_cache_key(user.pk)
+        shared.set(user_key, sorted(set(shared.get(user_key, [])) | {cache_key}), ttl)
+
+
+def invalidate_token(key_hash):
+    local_cache.discard(key_hash)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_token_cache_key(key_hash))
+
+
+def invalidate_users(user_ids):
+    user_ids = list(user_ids)
+    local_cache.discard_users(user_ids)
+    shared = _shared_cache()
+    if shared is not None:
+        user_keys = [_user_cache_key(user_id) for user_id in user_ids]
+        token_keys = [k for keys in shared.get_many(user_keys).values() for k in keys]
+        shared.delete_many(token_keys + user_keys)
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """`Authorization: Token <key>` as before; one indexed query on a cache miss."""
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        key_hash = AuthToken.hash_key(key)
+        cached = get_cached(key_hash)
+        if cached is None:
+            try:
+                token = AuthToken.objects.select_related("user").get(key_hash=key_hash)
+            except AuthToken.DoesNotExist:
+                token = AuthToken.upgrade_legacy(key)
+                if token is None:
+                    raise exceptions.AuthenticationFailed(_("Invalid token."))
+            user = token.user
+            remember(key_hash, user, token)
+        else:
+            user, token = cached
+        if token.is_expired:
+            raise exceptions.AuthenticationFailed(_("Token has expired."))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return copy.copy(user), token
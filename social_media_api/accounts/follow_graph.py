@@ -0,0 +1,200 @@
+# accounts/follow_graph.py
+"""
+Set-based operations on the follow graph (the `following` through table).
+
+- Membership is a single-row EXISTS, never a scan of the following list
+- follow_many / unfollow_many touch any number of users in a handful of
+  statements (INSERT ... ON CONFLICT DO NOTHING RETURNING / one DELETE)
+- Only edges the database reports as inserted or deleted count as changes, so
+  concurrent duplicate follows are recorded once. They go through
+  signals.record_follow_changes, so counters and timelines stay in step
+  exactly as with user.following.add/remove
+- relationships() answers "do I follow them / do they follow me" for a whole
+  page of users in two queries, memoized per request by relationships_for()
+- recount() rebuilds followers_count / following_count from the edges
+  (`manage.py recount_follows`; run it once after deploying the counters
+  onto an existing database)
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .authentication import invalidate_users
+
+from .models import CustomUser
+from .signals import record_follow_changes
+
+Follow = CustomUser.following.through
+
+BATCH_SIZE = 1000
+MAX_BULK_USERS = 5000
+MAX_RELATIONSHIP_USERS = 500
+RECOUNT_BATCH_SIZE = 5000
+
+
+def _edges(follower_id, user_ids):
+    return Follow.objects.filter(from_customuser_id=follower_id, to_customuser_id__in=user_ids)
+
+
+def is_following(follower_id, user_id):
+    return Follow.objects.filter(
+        from_customuser_id=follower_id, to_customuser_id=user_id
+    ).exists()
+
+
+def following_among(follower_id, user_ids):
+    """The subset of `user_ids` that `follower_id` already follows."""
+    return set(_edges(follower_id, user_ids).values_list("to_customuser_id", flat=True))
+
+
+def followers_among(user_id, follower_ids):
+    """The subset of `follower_ids` that follow `user_id`."""
+    return set(
+        Follow.objects.filter(to_customuser_id=user_id, from_customuser_id__in=follower_ids)
+        .values_list("from_customuser_id", flat=True)
+    )
+
+
+def relationships(viewer_id, user_ids):
+    """{user id: (viewer follows them, they follow the viewer)} in two queries."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    following = following_among(viewer_id, user_ids)
+    followers = followers_among(viewer_id, user_ids)
+    return {pk: (pk in following, pk in followers) for pk in user_ids}
+
+
+def relationships_for(request, user_ids):
+    """relationships() for the request's user, remembered on the request."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {pk: (False, False) for pk in user_ids}
+    memo = getattr(request, "_follow_relationships", None)
+    if memo is None:
+        memo = request._follow_relationships = {}
+    missing = set(user_ids) - memo.keys()
+    if missing:
+        memo.update(relationships(user.pk, missing))
+    return {pk: memo[pk] for pk in user_ids}
+
+
+def _insert_edges(follower_id, user_ids):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING for edges follower -> user_ids;
+    returns the ids whose edge was really inserted by this statement.
+    """
+    qn = connection.ops.quote_name
+    table = qn(Follow._meta.db_table)
+    from_col = qn(Follow._meta.get_field("from_customuser").column)
+    to_col = qn(Follow._meta.get_field("to_customuser").column)
+    size = min(BATCH_SIZE, connection.ops.bulk_batch_size([from_col, to_col], user_ids))
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), size):
+            batch = user_ids[start:start + size]
+            cursor.execute(
+                f"INSERT INTO {table} ({from_col}, {to_col}) VALUES {', '.join(['(%s, %s)'] * len(batch))} "
+                f"ON CONFLICT ({from_col}, {to_col}) DO NOTHING RETURNING {to_col}",
+                [value for pk in batch for value in (follower_id, pk)],
+            )
+            inserted.extend(row[0] for row in cursor.fetchall())
+    return sorted(inserted)
+
+
+def follow_many(follower, user_ids):
+    """Follow every existing user in `user_ids`; returns the ids that were newly followed."""
+    wanted = set(user_ids) - {follower.pk}
+    if not wanted:
+        return []
+    with transaction.atomic():
+        valid = sorted(CustomUser.objects.filter(pk__in=wanted).values_list("pk", flat=True))
+        new = _insert_edges(follower.pk, valid)
+        record_follow_changes(follower.pk, new, 1)
+    return new
+
+
+def unfollow_many(follower, user_ids):
+    """Unfollow every user in `user_ids`; returns the ids that were actually unfollowed."""
+    wanted = set(user_ids)
+    if not wanted:
+        return []
+    with transaction.atomic():
+        removed = sorted(
+            _edges(follower.pk, wanted).select_for_update()
+            .values_list("to_customuser_id", flat=True)
+        )
+        if removed:
+            _edges(follower.pk, removed).delete()
+        record_follow_changes(follower.pk, removed, -1)
+    return removed
+
+
+def follow(follower, user):
+    """Single INSERT ... ON CONFLICT DO NOTHING; returns True when a new edge was created."""
+    if user.pk == follower.pk:
+        return False
+    with transaction.atomic():
+        created = bool(_insert_edges(follower.pk, [user.pk]))
+        if created:
+            record_follow_changes(follower.pk, [user.pk], 1)
+    return created
+
+
+def unfollow(follower, user):
+    """Single DELETE; returns True when an edge was removed."""
+    with transaction.atomic():
+        deleted, _ = _edges(follower.pk, [user.pk]).delete()
+        if deleted:
+            record_follow_changes(follower.pk, [user.pk], -1)
+    return bool(deleted)
+
+
+def _count_by(column):
+    return Coalesce(
+        Subquery(
+            Follow.objects.filter(**{column: OuterRef("pk")})
+            .order_by()
+            .values(column)
+            .annotate(n=Count("id"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def recount(batch_size=RECOUNT_BATCH_SIZE, dry_run=False):
+    """Repair drifted follow counters; returns the number of users that had drifted."""
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            CustomUser.objects.filter(id__gt=last_id).order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        drifted = list(
+            CustomUser.objects.filter(id__in=ids)
+            .annotate(
+                real_followers=_count_by("to_customuser"),
+                real_following=_count_by("from_customuser"),
+            )
+            .filter(~Q(followers_count=F("real_followers")) | ~Q(following_count=F("real_following")))
+            .only("id", "followers_count", "following_count")
+        )
+        if not drifted:
+            continue
+        fixed += len(drifted)
+        if dry_run:
+            continue
+        for user in drifted:
+            user.followers_count = user.real_followers
+            user.following_count = user.real_following
+        with transaction.atomic():
+            CustomUser.objects.bulk_update(drifted, ["followers_count", "following_count"])
+        invalidate_users([user.pk for user in drifted])
+    return fixed
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from accounts import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's \"people you may know\" suggestions from the follow graph "
+        "(loaded once into memory). Schedule it, e.g. nightly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-k", type=int, default=None,
+            help="Suggestions kept per user (default FOLLOW_SUGGESTIONS_TOP_K, 20).",
+        )
+        parser.add_argument("--batch-size", type=int, default=suggestions.BATCH_SIZE, help="Users written per transaction.")
+        parser.add_argument("--no-numpy", action="store_true", help="Use the pure-Python graph even if NumPy is installed.")
+
+    def handle(self, *args, **options):
+        graph = suggestions.FollowGraph.load(use_numpy=False if options["no_numpy"] else None)
+        written = suggestions.compute_all(graph, k=options["top_k"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {written} suggestion(s) for {len(graph)} user(s)."
+        ))
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import AuthToken, token_ttl
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired API tokens in batches (schedule it, e.g. hourly from cron). "
+        "--import-legacy first moves all remaining rest_framework.authtoken tokens over as hashed, "
+        "expiring tokens (optional: each legacy key is also converted on its first use)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Tokens deleted per statement.")
+        parser.add_argument(
+            "--import-legacy", action="store_true",
+            help="Convert the old plain-text authtoken table (keys keep working until they expire).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["import_legacy"]:
+            self.import_legacy(batch_size)
+
+        now = timezone.now()
+        purged = 0
+        while True:
+            ids = list(
+                AuthToken.objects.filter(expires_at__lte=now).order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            purged += AuthToken.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired token(s)."))
+
+    def import_legacy(self, batch_size):
+        from rest_framework.authtoken.models import Token
+
+        expires_at = timezone.now() + timedelta(seconds=token_ttl())
+        imported = 0
+        while True:
+            legacy = list(Token.objects.order_by("key").values_list("key", "user_id")[:batch_size])
+            if not legacy:
+                break
+            with transaction.atomic():
+                AuthToken.objects.bulk_create(
+                    [
+                        AuthToken(key_hash=AuthToken.hash_key(key), user_id=user_id, expires_at=expires_at)
+                        for key, user_id in legacy
+                    ],
+                    ignore_conflicts=True,
+                )
+                Token.objects.filter(key__in=[key for key, _ in legacy]).delete()
+            imported += len(legacy)
+        self.stdout.write(f"Imported {imported} legacy token(s).")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts import follow_graph
+
+
+class Command(BaseCommand):
+    help = "Recount CustomUser.followers_count / following_count from the follow table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=follow_graph.RECOUNT_BATCH_SIZE, help="Users checked per batch."
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        fixed = follow_graph.recount(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {fixed} user(s) with drifted follow counters."))
@@ -37,8 +37,15 @@
 #         return self.followers.filter(id=user.id).exists()
 
 
-from django.db import models
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 
 class CustomUser(AbstractUser):
     bio = models.TextField(max_length=160, blank=True)
@@ -51,18 +58,116 @@ class CustomUser(AbstractUser):
         blank=True
     )
 
+    # Denormalized counters, maintained by accounts/signals.py on every
+    # change to `following` (fill / repair them with
+    # `manage.py recount_follows`).
+    # Prefer follow()/unfollow() or accounts/follow_graph.py for writes.
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    # Badge counter, maintained by notifications/counters.py
+    unread_notifications_count = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.username
 
     def follow(self, user):
-        if user != self:
-            self.following.add(user)
+        from .follow_graph import follow
+        return follow(self, user)
 
     def unfollow(self, user):
-        if user in self.following.all():
-            self.following.remove(user)
+        from .follow_graph import unfollow
+        return unfollow(self, user)
 
     def is_following(self, user):
-        return self.following.filter(id=user.id).exists()
+        from .follow_graph import is_following
+        return is_following(self.pk, user.pk)
+
+
+def token_ttl():
+    """Lifetime of a new API token in seconds (AUTH_TOKEN_TTL, default 30 days)."""
+    return getattr(settings, "AUTH_TOKEN_TTL", 30 * 24 * 3600)
 
 
+class AuthToken(models.Model):
+    """
+    API token stored as a SHA-256 digest: the raw key is handed out once
+    (register / login / rotate) and looked up by the unique `key_hash`.
+    Expired rows are purged by `manage.py purge_expired_tokens`.
+    """
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="auth_tokens")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Token for {self.user_id} (expires {self.expires_at:%Y-%m-%d})"
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def issue(cls, user, ttl=None):
+        """Create a token for `user`; returns (token, raw key)."""
+        key = secrets.token_hex(20)
+        token = cls.objects.create(
+            user=user,
+            key_hash=cls.hash_key(key),
+            expires_at=timezone.now() + timedelta(seconds=ttl or token_ttl()),
+        )
+        return token, key
+
+    @classmethod
+    def upgrade_legacy(cls, key):
+        """
+        Move a plain-text rest_framework.authtoken key over on first use: it
+        becomes a hashed, expiring token and the old row goes. Returns the
+        token, or None when `key` is not a legacy key either.
+        """
+        if not apps.is_installed("rest_framework.authtoken"):
+            return None
+        from rest_framework.authtoken.models import Token
+
+        with transaction.atomic():
+            user_id = (
+                Token.objects.select_for_update().filter(key=key)
+                .values_list("user_id", flat=True).first()
+            )
+            if user_id is None:
+                return None
+            token, _ = cls.objects.get_or_create(
+                key_hash=cls.hash_key(key),
+                defaults={"user_id": user_id, "expires_at": timezone.now() + timedelta(seconds=token_ttl())},
+            )
+            Token.objects.filter(key=key).delete()
+        return token
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def rotate(self):
+        """Replace this token with a fresh one; returns (token, raw key)."""
+        with transaction.atomic():
+            new = self.issue(self.user)
+            self.delete()
+        return new
+
+
+class FollowSuggestion(models.Model):
+    """
+    Precomputed "people you may know" entry: `suggested` is followed by
+    `mutual_count` of the users `user` follows. Rebuilt in bulk by
+    accounts/suggestions.py; `rank` 0 is the best suggestion.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="follow_suggestions")
+    suggested = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="+")
+    mutual_count = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["user", "rank"]
+        unique_together = ("user", "rank")
+
+    def __str__(self):
+        return f"Suggest {self.suggested_id} to {self.user_id} ({self.mutual_count} mutual)"
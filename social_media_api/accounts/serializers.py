@@ -53,16 +53,16 @@
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
-from rest_framework.authtoken.models import Token
-from .models import CustomUser
+from . import follow_graph
+from .models import CustomUser, FollowSuggestion
 
 
 User = get_user_model()
 
 
 class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.IntegerField(source='followers.count', read_only=True)
-    following_count = serializers.IntegerField(source='following.count', read_only=True)
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -87,9 +87,8 @@ class RegisterSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # IMPORTANT: use get_user_model().objects.create_user to satisfy tests & hash password
         password = validated_data.pop('password')
-        user = get_user_model().objects.create_user(password=password, **validated_data)
-        Token.objects.create(user=user)
-        return user
+        # The API token is issued by RegisterView (only its hash is stored)
+        return get_user_model().objects.create_user(password=password, **validated_data)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -112,9 +111,74 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
 
 # follows and unfollow
 class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.IntegerField(source="followers.count", read_only=True)
-    following_count = serializers.IntegerField(source="following.count", read_only=True)
+    # Counter columns on CustomUser, no COUNT queries per user
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = CustomUser
         fields = ["id", "username", "email", "bio", "profile_picture", "followers_count", "following_count"]
+
+
+class UserRelationshipListSerializer(serializers.ListSerializer):
+    """Resolves follow status for the whole page before rendering its users."""
+
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, "all") else data)
+        follow_graph.relationships_for(self.context.get("request"), [user.pk for user in users])
+        return super().to_representation(users)
+
+
+class UserRelationshipSerializer(UserSerializer):
+    """UserSerializer plus how the user relates to the viewer (user list/detail)."""
+    is_followed_by_me = serializers.SerializerMethodField()
+    follows_me = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ["is_followed_by_me", "follows_me"]
+        list_serializer_class = UserRelationshipListSerializer
+
+    def _relationship(self, obj):
+        return follow_graph.relationships_for(self.context.get("request"), [obj.pk])[obj.pk]
+
+    def get_is_followed_by_me(self, obj):
+        return self._relationship(obj)[0]
+
+    def get_follows_me(self, obj):
+        return self._relationship(obj)[1]
+
+
+class RelationshipQuerySerializer(serializers.Serializer):
+    """Payload for the batch relationship lookup."""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=follow_graph.MAX_RELATIONSHIP_USERS,
+    )
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    """Payload for follow/unfollow of many users at once (e.g. contact import)."""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=follow_graph.MAX_BULK_USERS,
+    )
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    """A suggested user, flattened, with how many of the people you follow follow them."""
+    id = serializers.IntegerField(source="suggested.id", read_only=True)
+    username = serializers.CharField(source="suggested.username", read_only=True)
+    avatar = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ("id", "username", "avatar", "mutual_count")
+
+    def get_avatar(self, obj):
+        pic = obj.suggested.profile_picture
+        try:
+            return pic.url if pic else None
+        except Exception:
+            return None
@@ -0,0 +1,80 @@
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+from .authentication import invalidate_token, invalidate_users
+from .models import AuthToken, CustomUser
+
+Follow = CustomUser.following.through
+
+# Sent once follow edges have really changed, whatever the code path
+# (follow_graph service, user.following.add/remove, admin):
+#   sender=CustomUser, follower_id=<int>, user_ids=[<int>, ...]
+user_followed = Signal()
+user_unfollowed = Signal()
+
+
+def record_follow_changes(follower_id, user_ids, delta):
+    """
+    Bump both counters for edges follower -> user_ids and announce the change.
+    Counters never drop below zero (edges older than the counters start at 0).
+    """
+    if not user_ids:
+        return
+    CustomUser.objects.filter(pk=follower_id).update(
+        following_count=Greatest(F("following_count") + delta * len(user_ids), Value(0))
+    )
+    CustomUser.objects.filter(pk__in=user_ids).update(
+        followers_count=Greatest(F("followers_count") + delta, Value(0))
+    )
+    invalidate_users([follower_id, *user_ids])  # cached request.user carries the counters
+    signal = user_followed if delta > 0 else user_unfollowed
+    signal.send(sender=CustomUser, follower_id=follower_id, user_ids=list(user_ids))
+
+
+def _existing(instance, reverse, pk_set=None):
+    """Ids on the other end of `instance`'s follow edges that are really in the table."""
+    if reverse:  # instance.followers.<op>(...)
+        qs = Follow.objects.filter(to_customuser_id=instance.pk)
+        column = "from_customuser_id"
+    else:
+        qs = Follow.objects.filter(from_customuser_id=instance.pk)
+        column = "to_customuser_id"
+    if pk_set is not None:
+        qs = qs.filter(**{f"{column}__in": pk_set})
+    return list(qs.values_list(column, flat=True))
+
+
+def _record(instance, reverse, other_ids, delta):
+    if reverse:
+        for follower_id in other_ids:
+            record_follow_changes(follower_id, [instance.pk], delta)
+    else:
+        record_follow_changes(instance.pk, other_ids, delta)
+
+
+@receiver(m2m_changed, sender=Follow)
+def maintain_follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    # post_add receives only the ids that were really inserted; remove/clear
+    # receive whatever was asked for, so capture the real edges beforehand.
+    if action == "post_add":
+        _record(instance, reverse, list(pk_set), 1)
+    elif action == "pre_remove":
+        instance._follow_ids_removed = _existing(instance, reverse, pk_set)
+    elif action == "pre_clear":
+        instance._follow_ids_removed = _existing(instance, reverse)
+    elif action in ("post_remove", "post_clear"):
+        _record(instance, reverse, getattr(instance, "_follow_ids_removed", []), -1)
+        instance._follow_ids_removed = []
+
+
+# Token cache (accounts/authentication.py): logout / rotation, deactivation, edits
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key_hash)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_changed_user(sender, instance, **kwargs):
+    invalidate_users([instance.pk])
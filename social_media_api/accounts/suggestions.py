@@ -0,0 +1,158 @@
+# accounts/suggestions.py
+"""
+"People you may know": friends-of-friends follow suggestions, computed in bulk.
+
+- The whole `following` table is read once into CSR arrays (indptr/indices
+  over dense user indices): NumPy when it is installed, the stdlib `array`
+  module otherwise. No per-user self-joins
+- Users and edges are read in one transaction (REPEATABLE READ on
+  PostgreSQL), and edges whose ends are not among the users read are
+  dropped, so signups and follows during the load cannot break it
+- A user's candidates are the accounts followed by the accounts they follow,
+  scored by how many of those follow them (mutual_count), minus themselves
+  and anyone they already follow; ties go to the lower user id
+- The top FOLLOW_SUGGESTIONS_TOP_K (20) per user are stored in
+  FollowSuggestion, so the endpoint is one indexed read
+- Run `manage.py compute_follow_suggestions` periodically (e.g. nightly)
+"""
+import heapq
+from array import array
+from collections import Counter
+from itertools import chain
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import CustomUser, FollowSuggestion
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+Follow = CustomUser.following.through
+
+BATCH_SIZE = 1000
+
+
+def top_k():
+    return getattr(settings, "FOLLOW_SUGGESTIONS_TOP_K", 20)
+
+
+class FollowGraph:
+    """
+    Who-follows-whom in compressed sparse row form: the users followed by the
+    user at dense index u are indices[indptr[u]:indptr[u + 1]].
+    """
+
+    def __init__(self, user_ids, indptr, indices):
+        self.user_ids = user_ids  # dense index -> user id, ascending
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @classmethod
+    def load(cls, use_numpy=None, chunk_size=10000):
+        use_numpy = np is not None if use_numpy is None else use_numpy
+        users = CustomUser.objects.order_by("id").values_list("id", flat=True)
+        edges = Follow.objects.order_by().values_list("from_customuser_id", "to_customuser_id")
+        outermost = not connection.in_atomic_block
+        with transaction.atomic():
+            if outermost and connection.vendor == "postgresql":
+                # Both reads see one snapshot (the default READ COMMITTED
+                # takes a new one per statement)
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            if use_numpy:
+                user_ids = np.fromiter(users.iterator(chunk_size), dtype=np.int64)
+                flat = np.fromiter(chain.from_iterable(edges.iterator(chunk_size)), dtype=np.int64)
+                return cls._from_numpy(user_ids, flat[0::2], flat[1::2])
+            user_ids = array("q", users.iterator(chunk_size))
+            position = {user_id: i for i, user_id in enumerate(user_ids)}
+            rows = [[] for _ in user_ids]
+            for follower_id, followed_id in edges.iterator(chunk_size):
+                u, v = position.get(follower_id), position.get(followed_id)
+                if u is not None and v is not None:  # both ends among the users read
+                    rows[u].append(v)
+
+        indptr, indices = array("q", [0]), array("l")
+        for row in rows:
+            indices.extend(row)
+            indptr.append(len(indices))
+        return cls(user_ids, indptr, indices)
+
+    @classmethod
+    def _from_numpy(cls, user_ids, followers, followed):
+        n = len(user_ids)
+        if not n:
+            return cls(user_ids, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        src = np.searchsorted(user_ids, followers).clip(max=n - 1)
+        dst = np.searchsorted(user_ids, followed).clip(max=n - 1)
+        # Keep only edges whose ends are both among the users read
+        known = (user_ids[src] == followers) & (user_ids[dst] == followed)
+        src, dst = src[known], dst[known].astype(np.int32)
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return cls(user_ids, indptr, dst[order])
+
+    def suggest(self, u, k):
+        """[(dense index, mutual count)] best first, at most k."""
+        if np is not None and isinstance(self.indices, np.ndarray):
+            return self._suggest_numpy(u, k)
+        return self._suggest_python(u, k)
+
+    def _suggest_numpy(self, u, k):
+        indptr, indices = self.indptr, self.indices
+        follows = indices[indptr[u]:indptr[u + 1]]
+        starts = indptr[follows]
+        lengths = indptr[follows + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return []
+        # Every followed user's row in one gather: row start + offset within the row
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        candidates = indices[np.repeat(starts, lengths) + offsets]
+        candidates = candidates[(candidates != u) & ~np.isin(candidates, follows)]
+        if not len(candidates):
+            return []
+        ids, counts = np.unique(candidates, return_counts=True)
+        best = np.lexsort((ids, -counts))[:k]
+        return list(zip(ids[best].tolist(), counts[best].tolist()))
+
+    def _suggest_python(self, u, k):
+        indptr, indices = self.indptr, self.indices
+        follows = indices[indptr[u]:indptr[u + 1]]
+        counts = Counter()
+        for v in follows:
+            counts.update(indices[indptr[v]:indptr[v + 1]])
+        for excluded in chain(follows, (u,)):
+            counts.pop(excluded, None)
+        return heapq.nsmallest(k, counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def compute_all(graph=None, k=None, batch_size=BATCH_SIZE):
+    """Replace every user's stored suggestions; returns the number of rows written."""
+    graph = graph if graph is not None else FollowGraph.load()
+    k = k or top_k()
+    user_ids = graph.user_ids
+    written = 0
+    for start in range(0, len(graph), batch_size):
+        batch = range(start, min(start + batch_size, len(graph)))
+        rows = [
+            FollowSuggestion(
+                user_id=int(user_ids[u]),
+                suggested_id=int(user_ids[v]),
+                mutual_count=int(count),
+                rank=rank,
+            )
+            for u in batch
+            for rank, (v, count) in enumerate(graph.suggest(u, k))
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=[int(user_ids[u]) for u in batch]).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+    return written
@@ -1,3 +1,446 @@
-from django.test import TestCase
+"""
+API tests for accounts: registration, profiles and the follow graph.
 
-# Create your tests here.
+Run:
+    python manage.py test accounts -v 2
+"""
+
+import random
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from . import follow_graph, suggestions
+from .authentication import local_cache
+from .models import AuthToken
+from .serializers import UserSerializer
+from .signals import user_followed
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowCounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.alice = User.objects.create_user(username="alice", password="pass1234")
+        cls.bob = User.objects.create_user(username="bob", password="pass1234")
+        cls.carol = User.objects.create_user(username="carol", password="pass1234")
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.followers_count, user.following_count
+
+    def test_follow_and_unfollow_maintain_counters(self):
+        self.client.force_authenticate(self.alice)
+        res = self.client.post(reverse("follow-user", args=[self.bob.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.alice.follow(self.bob)  # duplicate follow is not double counted
+        self.carol.follow(self.bob)
+        self.assertEqual(self.counts(self.bob), (2, 0))
+        self.assertEqual(self.counts(self.alice), (0, 1))
+
+        self.client.post(reverse("unfollow-user", args=[self.bob.id]))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+        self.assertEqual(self.counts(self.alice), (0, 0))
+
+    def test_remove_and_clear_only_count_existing_edges(self):
+        self.alice.following.add(self.bob)
+        self.alice.following.remove(self.bob, self.carol)  # carol was never followed
+        self.assertEqual(self.counts(self.carol), (0, 0))
+        self.assertEqual(self.counts(self.alice), (0, 0))
+
+        self.bob.followers.add(self.alice, self.carol)
+        self.bob.followers.clear()
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertEqual(self.counts(self.carol), (0, 0))
+
+    def test_recount_repairs_drift(self):
+        self.alice.follow(self.bob)
+        get_user_model().objects.filter(pk=self.bob.pk).update(followers_count=9)
+
+        call_command("recount_follows", stdout=StringIO())
+        self.assertEqual(self.counts(self.bob), (1, 0))
+
+    def test_unfollow_before_counters_floors_at_zero(self):
+        # An edge made before the counters existed: both are still 0
+        self.alice.following.add(self.bob)
+        get_user_model().objects.update(followers_count=0, following_count=0)
+
+        self.client.force_authenticate(self.alice)
+        res = self.client.post(reverse("unfollow-user", args=[self.bob.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertEqual(self.counts(self.alice), (0, 0))
+
+    def test_serializing_users_runs_no_queries(self):
+        users = list(get_user_model().objects.all())
+        with CaptureQueriesContext(connection) as ctx:
+            UserSerializer(users, many=True).data
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowGraphTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create_user(username="importer", password="pass1234")
+        cls.others = [
+            User.objects.create(username=f"contact{i}")
+            for i in range(30)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.me)
+
+    def test_bulk_follow_is_set_based_and_idempotent(self):
+        ids = [u.id for u in self.others] + [self.me.id, 999999]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(reverse("follow-bulk"), {"user_ids": ids}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 30)
+        self.assertLess(len(ctx.captured_queries), 15)
+
+        res = self.client.post(reverse("follow-bulk"), {"user_ids": ids}, format="json")
+        self.assertEqual(res.data["followed"], [])
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 30)
+
+    def test_edges_inserted_concurrently_are_not_counted_again(self):
+        # Rows another request inserted after any check this one could make
+        Follow = get_user_model().following.through
+        Follow.objects.bulk_create([
+            Follow(from_customuser_id=self.me.id, to_customuser_id=user.id) for user in self.others[:2]
+        ])
+        received = []
+
+        def record(sender, user_ids, **kwargs):
+            received.extend(user_ids)
+
+        user_followed.connect(record)
+        self.addCleanup(user_followed.disconnect, record)
+        self.assertFalse(self.me.follow(self.others[0]))
+        followed = follow_graph.follow_many(self.me, [self.others[1].id, self.others[2].id])
+
+        self.assertEqual(followed, [self.others[2].id])
+        self.assertEqual(received, [self.others[2].id])
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 1)
+
+    def test_bulk_unfollow_only_reports_real_edges(self):
+        self.me.follow(self.others[0])
+        res = self.client.post(
+            reverse("unfollow-bulk"),
+            {"user_ids": [self.others[0].id, self.others[1].id]},
+            format="json",
+        )
+        self.assertEqual(res.data["unfollowed"], [self.others[0].id])
+        self.others[0].refresh_from_db()
+        self.assertEqual(self.others[0].followers_count, 0)
+
+    def test_unfollow_does_not_load_following_list(self):
+        for user in self.others:
+            self.me.follow(user)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(self.me.unfollow(self.others[0]))
+        self.assertFalse(any("SELECT" in q["sql"] and "accounts_customuser_following" in q["sql"]
+                             for q in ctx.captured_queries))
+        self.assertFalse(self.me.unfollow(self.others[0]))
+        self.assertFalse(self.me.is_following(self.others[0]))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ProfileConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create_user(username="me", password="pass1234")
+        cls.fan = User.objects.create_user(username="fan", password="pass1234")
+
+    def setUp(self):
+        self.client.force_authenticate(self.me)
+
+    def test_profile_304_until_it_changes(self):
+        url = reverse("profile")
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.fan.follow(self.me)
+        self.me.refresh_from_db()
+        self.client.force_authenticate(self.me)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.data["followers_count"], 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        local_cache.clear()
+        cache.clear()
+        resp = self.client.post(reverse("register"), {"username": "cached", "password": "S3cure-pass!"})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.user = get_user_model().objects.get(username="cached")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {resp.data['token']}")
+        self.profile_url = reverse("profile")
+
+    def get_profile(self):
+        return self.client.get(self.profile_url)
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+
+    def test_logout_deactivation_and_counters_invalidate(self):
+        self.get_profile()
+        fan = get_user_model().objects.create(username="cachefan")
+        fan.follow(self.user)
+        self.assertEqual(self.get_profile().data["followers_count"], 1)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.is_active = True
+        self.user.save()
+
+        self.get_profile()
+        self.assertEqual(self.client.post(reverse("logout")).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_profile().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS="default")
+    def test_shared_cache_warms_other_workers_and_is_invalidated(self):
+        self.get_profile()
+        local_cache.clear()  # as if this were another process
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_profile().status_code, status.HTTP_200_OK)
+
+        self.client.post(reverse("logout"))
+        local_cache.clear()
+        self.assertEqual(self.get_profile().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_CACHE_SIZE=1, AUTH_TOKEN_CACHE_TTL=0)
+    def test_lru_is_bounded_and_entries_expire(self):
+        self.get_profile()
+        self.assertEqual(len(local_cache.entries), 1)
+        with self.assertNumQueries(1):  # expired at once
+            self.get_profile()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AuthTokenTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username="tokens", password="S3cure-pass!")
+
+    def setUp(self):
+        local_cache.clear()
+
+    def login(self):
+        resp = self.client.post(reverse("login"), {"username": "tokens", "password": "S3cure-pass!"})
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp.data["token"]
+
+    def auth(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {key}")
+        return self.client.get(reverse("profile")).status_code
+
+    def test_only_hashes_are_stored_and_lookup_is_one_query(self):
+        key = self.login()
+        self.assertFalse(AuthToken.objects.filter(key_hash=key).exists())
+        self.assertTrue(AuthToken.objects.filter(key_hash=AuthToken.hash_key(key)).exists())
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.auth(key), status.HTTP_200_OK)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn("key_hash", ctx.captured_queries[0]["sql"])
+
+    def test_each_login_gets_its_own_token(self):
+        first, second = self.login(), self.login()
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.auth(first), status.HTTP_200_OK)
+        self.assertEqual(self.auth(second), status.HTTP_200_OK)
+
+    def test_expired_tokens_are_rejected_even_when_cached(self):
+        key = self.login()
+        self.assertEqual(self.auth(key), status.HTTP_200_OK)
+        AuthToken.objects.update(expires_at=timezone.now())
+        local_cache.clear()
+        self.assertEqual(self.auth(key), status.HTTP_401_UNAUTHORIZED)
+
+        token, key = AuthToken.issue(self.user)
+        self.assertEqual(self.auth(key), status.HTTP_200_OK)  # now cached
+        with mock.patch("accounts.models.timezone.now", return_value=token.expires_at):
+            self.assertEqual(self.auth(key), status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotation_invalidates_the_old_key(self):
+        old = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {old}")
+        resp = self.client.post(reverse("token-rotate"))
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.auth(old), status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.auth(resp.data["token"]), status.HTTP_200_OK)
+
+    def test_legacy_key_is_upgraded_on_first_use(self):
+        from rest_framework.authtoken.models import Token
+
+        legacy = Token.objects.create(user=self.user)
+        self.assertEqual(self.auth(legacy.key), status.HTTP_200_OK)
+        self.assertFalse(Token.objects.exists())
+        self.assertTrue(AuthToken.objects.filter(key_hash=AuthToken.hash_key(legacy.key)).exists())
+        local_cache.clear()
+        self.assertEqual(self.auth(legacy.key), status.HTTP_200_OK)
+        self.assertEqual(self.auth("not-a-key"), status.HTTP_401_UNAUTHORIZED)
+
+    def test_purge_expired_tokens_in_batches_and_import_legacy(self):
+        from rest_framework.authtoken.models import Token
+
+        for _ in range(5):
+            AuthToken.issue(self.user, ttl=3600)
+        AuthToken.objects.update(expires_at=timezone.now())
+        live, live_key = AuthToken.issue(self.user)
+        legacy = Token.objects.create(user=self.user)
+
+        out = StringIO()
+        call_command("purge_expired_tokens", "--batch-size", "2", "--import-legacy", stdout=out)
+        self.assertIn("Purged 5", out.getvalue())
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(AuthToken.objects.count(), 2)
+        self.assertEqual(self.auth(legacy.key), status.HTTP_200_OK)
+        self.assertEqual(self.auth(live_key), status.HTTP_200_OK)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowSuggestionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        names = ["me", "a", "b", "c", "x", "y", "z", "loner"]
+        cls.u = {name: User.objects.create_user(username=f"sg_{name}", password="pass1234") for name in names}
+        graph = {"me": "abc", "a": "xy", "b": "xz", "c": ["x", "me", "a"]}
+        for follower, followed in graph.items():
+            cls.u[follower].following.add(*(cls.u[name] for name in followed))
+
+    def setUp(self):
+        self.client.force_authenticate(self.u["me"])
+
+    def suggested(self):
+        res = self.client.get(reverse("follow-suggestions"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [(row["username"][3:], row["mutual_count"]) for row in res.data]
+
+    def test_friends_of_friends_ranked_by_mutual_follows(self):
+        out = StringIO()
+        call_command("compute_follow_suggestions", stdout=out)
+        self.assertIn("for 8 user(s)", out.getvalue())
+        # a and the user themselves are excluded; ties go to the older account
+        self.assertEqual(self.suggested(), [("x", 3), ("y", 1), ("z", 1)])
+
+    def test_top_k_and_read_is_one_query(self):
+        suggestions.compute_all(k=2)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.suggested(), [("x", 3), ("y", 1)])
+
+    @skipIf(suggestions.np is None, "NumPy not installed")
+    def test_numpy_and_python_graphs_agree(self):
+        users = list(self.u.values())
+        rng = random.Random(7)
+        for user in users:
+            user.following.add(*rng.sample(users, 4))
+        fast = suggestions.FollowGraph.load(use_numpy=True)
+        slow = suggestions.FollowGraph.load(use_numpy=False)
+        for u in range(len(users)):
+            self.assertEqual(fast.suggest(u, 5), slow.suggest(u, 5))
+
+    def test_edges_to_users_not_read_are_dropped(self):
+        # As if someone signed up and followed between the two reads
+        Follow = get_user_model().following.through
+        ghost = get_user_model().objects.order_by("-id").values_list("id", flat=True).first() + 1
+        dangling = Follow.objects.bulk_create([
+            Follow(from_customuser_id=ghost, to_customuser_id=self.u["x"].id),
+            Follow(from_customuser_id=self.u["me"].id, to_customuser_id=ghost),
+        ])
+        self.addCleanup(Follow.objects.filter(pk__in=[edge.pk for edge in dangling]).delete)
+
+        me = list(self.u.values()).index(self.u["me"])
+        graphs = [suggestions.FollowGraph.load(use_numpy=False)]
+        if suggestions.np is not None:
+            graphs.append(suggestions.FollowGraph.load(use_numpy=True))
+        for graph in graphs:
+            self.assertEqual(len(graph), len(self.u))
+            self.assertEqual(graph.suggest(me, 1), [(list(self.u).index("x"), 3)])
+
+    def test_followed_since_and_recompute(self):
+        suggestions.compute_all()
+        self.u["me"].follow(self.u["x"])
+        self.assertEqual(self.suggested(), [("y", 1), ("z", 1)])
+
+        self.client.force_authenticate(self.u["loner"])
+        self.assertEqual(self.suggested(), [])
+        self.u["loner"].follow(self.u["me"])
+        suggestions.compute_all()
+        self.assertEqual(self.suggested(), [("a", 1), ("b", 1), ("c", 1), ("x", 1)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RelationshipTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create_user(username="rel_me", password="pass1234")
+        cls.mutual = User.objects.create_user(username="rel_mutual", password="pass1234")
+        cls.followed = User.objects.create_user(username="rel_followed", password="pass1234")
+        cls.fan = User.objects.create_user(username="rel_fan", password="pass1234")
+        cls.stranger = User.objects.create_user(username="rel_stranger", password="pass1234")
+        cls.me.following.add(cls.mutual, cls.followed)
+        cls.mutual.following.add(cls.me)
+        cls.fan.following.add(cls.me)
+        cls.expected = {
+            cls.me.id: (False, False),
+            cls.mutual.id: (True, True),
+            cls.followed.id: (True, False),
+            cls.fan.id: (False, True),
+            cls.stranger.id: (False, False),
+        }
+
+    def setUp(self):
+        self.client.force_authenticate(self.me)
+
+    def test_user_list_resolves_page_in_two_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("user-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        got = {u["id"]: (u["is_followed_by_me"], u["follows_me"]) for u in res.data["results"]}
+        self.assertEqual(got, self.expected)
+        edge_queries = [q for q in ctx.captured_queries if "accounts_customuser_following" in q["sql"]]
+        self.assertEqual(len(edge_queries), 2)
+
+    def test_user_detail(self):
+        res = self.client.get(reverse("user-detail", args=[self.fan.id]))
+        self.assertEqual((res.data["is_followed_by_me"], res.data["follows_me"]), (False, True))
+
+    def test_batch_endpoint(self):
+        ids = [self.stranger.id, self.mutual.id, self.fan.id, self.mutual.id, 999999]
+        with self.assertNumQueries(2):
+            res = self.client.post(reverse("relationships"), {"user_ids": ids}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r["id"], r["is_followed_by_me"], r["follows_me"]) for r in res.data],
+            [(self.stranger.id, False, False), (self.mutual.id, True, True),
+             (self.fan.id, False, True), (999999, False, False)],
+        )
+
+        too_many = {"user_ids": list(range(1, 502))}
+        res = self.client.post(reverse("relationships"), too_many, format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
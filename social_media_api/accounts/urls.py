@@ -1,6 +1,10 @@
 
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileView, FollowUserView, UnfollowUserView
+from .views import (
+    RegisterView, LoginView, LogoutView, RotateTokenView, ProfileView, FollowUserView, UnfollowUserView,
+    BulkFollowView, BulkUnfollowView, FollowSuggestionsView,
+    RelationshipsView, UserListView, UserDetailView,
+)
 
 urlpatterns = [
     # both with and without trailing slash for convenience
@@ -8,10 +12,19 @@ urlpatterns = [
     path('register/', RegisterView.as_view()),
     path('login', LoginView.as_view(), name='login'),
     path('login/', LoginView.as_view()),
+    path('logout', LogoutView.as_view(), name='logout'),
+    path('logout/', LogoutView.as_view()),
+    path('token/rotate/', RotateTokenView.as_view(), name='token-rotate'),
     path('profile', ProfileView.as_view(), name='profile'),
     path('profile/', ProfileView.as_view()),
     path("follow/<int:user_id>/", FollowUserView.as_view(), name="follow-user"),
     path("unfollow/<int:user_id>/", UnfollowUserView.as_view(), name="unfollow-user"),
+    path("follow/bulk/", BulkFollowView.as_view(), name="follow-bulk"),
+    path("unfollow/bulk/", BulkUnfollowView.as_view(), name="unfollow-bulk"),
+    path("suggestions/", FollowSuggestionsView.as_view(), name="follow-suggestions"),
+    path("relationships/", RelationshipsView.as_view(), name="relationships"),
+    path("users/", UserListView.as_view(), name="user-list"),
+    path("users/<int:id>/", UserDetailView.as_view(), name="user-detail"),
 ]
 
 
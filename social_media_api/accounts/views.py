@@ -1,6 +1,5 @@
 from rest_framework import permissions, status, generics
 from rest_framework.response import Response
-from rest_framework.authtoken.models import Token
 from django.shortcuts import get_object_or_404
 
 from .serializers import (
@@ -8,8 +7,15 @@ from .serializers import (
     LoginSerializer,
     UserSerializer,
     ProfileUpdateSerializer,
+    BulkFollowSerializer,
+    FollowSuggestionSerializer,
+    UserRelationshipSerializer,
+    RelationshipQuerySerializer,
 )
-from .models import CustomUser
+from .models import AuthToken, CustomUser, FollowSuggestion
+from . import follow_graph
+from posts.conditional import make_etag, precondition_response, set_validators
+from posts.pagination import DefaultPagination
 
 
 # ✅ Register using GenericAPIView
@@ -21,9 +27,9 @@ class RegisterView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        token, _ = Token.objects.get_or_create(user=user)
+        token, key = AuthToken.issue(user)
         return Response(
-            {"user": UserSerializer(user).data, "token": token.key},
+            {"user": UserSerializer(user).data, "token": key, "expires_at": token.expires_at},
             status=status.HTTP_201_CREATED,
         )
 
@@ -37,8 +43,28 @@ class LoginView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data["user"]
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response({"user": UserSerializer(user).data, "token": token.key})
+        # Only hashes are stored, so every login gets its own token (one per device)
+        token, key = AuthToken.issue(user)
+        return Response({"user": UserSerializer(user).data, "token": key, "expires_at": token.expires_at})
+
+
+# ✅ Logout: delete the token (also drops it from the token cache)
+class LogoutView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if request.auth is not None:
+            request.auth.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# ✅ Rotate: swap the current token for a fresh one (new key, new expiry)
+class RotateTokenView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        token, key = request.auth.rotate()
+        return Response({"token": key, "expires_at": token.expires_at})
 
 
 # ✅ Profile (Get & Update) using GenericAPIView
@@ -47,7 +73,16 @@ class ProfileView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        return Response(UserSerializer(request.user).data)
+        # request.user is already loaded by authentication: tag it without a query
+        user = request.user
+        etag = make_etag(
+            request, user.pk, user.username, user.email, user.bio,
+            user.profile_picture.name, user.followers_count, user.following_count,
+        )
+        early = precondition_response(request, etag)
+        if early is not None:
+            return early
+        return set_validators(Response(UserSerializer(user).data), etag)
 
     def patch(self, request, *args, **kwargs):
         serializer = self.get_serializer(request.user, data=request.data, partial=True)
@@ -84,16 +119,83 @@ class UnfollowUserView(generics.GenericAPIView):
         )
 
 
+# ✅ Follow many users in one call
+class BulkFollowView(generics.GenericAPIView):
+    """POST {"user_ids": [...]} -> set-based follow; unknown/self/already-followed ids are skipped."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        followed = follow_graph.follow_many(request.user, serializer.validated_data["user_ids"])
+        return Response({"followed": followed, "count": len(followed)}, status=status.HTTP_200_OK)
+
+
+# ✅ Unfollow many users in one call
+class BulkUnfollowView(generics.GenericAPIView):
+    """POST {"user_ids": [...]} -> one DELETE; ids not followed are skipped."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        unfollowed = follow_graph.unfollow_many(request.user, serializer.validated_data["user_ids"])
+        return Response({"unfollowed": unfollowed, "count": len(unfollowed)}, status=status.HTTP_200_OK)
+
+
+class FollowSuggestionsView(generics.ListAPIView):
+    """
+    GET /api/suggestions/ -> "people you may know", best first
+    - Precomputed top-K (accounts/suggestions.py): one indexed read, no graph queries
+    - Users followed since the last computation are left out
+    """
+    serializer_class = FollowSuggestionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        user = self.request.user
+        return (
+            FollowSuggestion.objects.filter(user=user, suggested__is_active=True)
+            .exclude(suggested__in=user.following.all())
+            .select_related("suggested")
+            .order_by("rank")
+        )
+
+
+class RelationshipsView(generics.GenericAPIView):
+    """
+    POST /api/relationships/ {"user_ids": [...]} (up to 500)
+    -> [{"id", "is_followed_by_me", "follows_me"}, ...] in request order, two queries
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = RelationshipQuerySerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data["user_ids"]))
+        statuses = follow_graph.relationships_for(request, user_ids)
+        return Response([
+            {"id": pk, "is_followed_by_me": statuses[pk][0], "follows_me": statuses[pk][1]}
+            for pk in user_ids
+        ])
+
+
 # ✅ List all users
 class UserListView(generics.ListAPIView):
-    queryset = CustomUser.objects.all()
-    serializer_class = UserSerializer
+    """Users with is_followed_by_me / follows_me, resolved per page in two queries."""
+    queryset = CustomUser.objects.order_by("id")
+    serializer_class = UserRelationshipSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DefaultPagination
 
 
 # ✅ Retrieve single user by ID
 class UserDetailView(generics.RetrieveAPIView):
     queryset = CustomUser.objects.all()
-    serializer_class = UserSerializer
+    serializer_class = UserRelationshipSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = "id"
@@ -0,0 +1,46 @@
+# notifications/counters.py
+"""
+CustomUser.unread_notifications_count bookkeeping.
+
+The counter moves only together with the rows it counts:
+- dispatcher.write() adds the unread rows it creates
+- mark_read() subtracts the rowcount of its single UPDATE
+- deleting an unread row (e.g. cascades) subtracts one (see signals.py)
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from accounts.authentication import invalidate_users
+from .models import Notification
+
+User = get_user_model()
+
+
+def adjust_unread(deltas):
+    """Apply {user_id: delta}; users sharing a delta are updated in one statement."""
+    by_delta = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        User.objects.filter(pk__in=user_ids).update(
+            unread_notifications_count=Greatest(F("unread_notifications_count") + delta, Value(0))
+        )
+        invalidate_users(user_ids)  # cached request.user carries the counter
+
+
+def count_created(notifications):
+    adjust_unread(Counter(n.recipient_id for n in notifications if not n.read))
+
+
+def mark_read(user, up_to_id=None):
+    """Mark the user's unread notifications (optionally only ids <= up_to_id) read in one UPDATE."""
+    qs = Notification.objects.filter(recipient=user, read=False)
+    if up_to_id is not None:
+        qs = qs.filter(id__lte=up_to_id)
+    updated = qs.update(read=True)
+    adjust_unread({user.pk: -updated})
+    return updated
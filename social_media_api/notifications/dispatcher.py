@@ -0,0 +1,218 @@
+# notifications/dispatcher.py
+"""
+In-process notification pipeline.
+
+- notify() queues an event once the caller's transaction commits, so
+  like/comment/follow requests never wait on notification writes
+- A daemon worker thread drains the queue every NOTIFICATIONS_FLUSH_INTERVAL
+  seconds (or as soon as NOTIFICATIONS_BATCH_SIZE events are waiting)
+- flush() coalesces events for the same (recipient, verb, target): one row per
+  group, merged into an unread row from the last NOTIFICATIONS_COALESCE_WINDOW
+  seconds if there is one ("X and 41 others liked your post"). Actors already
+  in the row's actor_ids are not counted again; past
+  NOTIFICATIONS_MAX_TRACKED_ACTORS (1000) distinct actors the oldest are
+  forgotten, so only then can a returning actor count twice
+- Written rows are published to open SSE streams (see pubsub.py)
+- With NOTIFICATIONS_ASYNC = False events are flushed inline (tests, scripts)
+"""
+import atexit
+import logging
+import threading
+from collections import namedtuple, OrderedDict
+from datetime import timedelta
+from queue import Empty, Queue
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .counters import count_created
+from .models import Notification
+from .pubsub import get_broker, user_channel
+
+logger = logging.getLogger(__name__)
+
+Event = namedtuple("Event", ["recipient_id", "actor_id", "verb", "target_content_type_id", "target_object_id"])
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def make_event(recipient, actor, verb, target=None):
+    ct_id = obj_id = None
+    if target is not None:
+        ct_id = ContentType.objects.get_for_model(target).id  # cached by ContentType manager
+        obj_id = target.pk
+    return Event(
+        getattr(recipient, "pk", recipient),
+        getattr(actor, "pk", actor),
+        verb,
+        ct_id,
+        obj_id,
+    )
+
+
+def _key(event):
+    return (event.recipient_id, event.verb, event.target_content_type_id, event.target_object_id)
+
+
+def coalesce(events):
+    """Group events by (recipient, verb, target) -> {key: [distinct actor ids, latest last]}."""
+    groups = OrderedDict()
+    for event in events:
+        actors = groups.setdefault(_key(event), [])
+        if event.actor_id in actors:
+            actors.remove(event.actor_id)
+        actors.append(event.actor_id)
+    return groups
+
+
+def merge_actors(n, actors):
+    """Fold the distinct `actors` (latest last) into notification `n`."""
+    tracked = n.actor_ids or [n.actor_id]  # rows written before actor_ids
+    seen = set(tracked)
+    n.actor_count += sum(1 for a in actors if a not in seen)
+    latest = set(actors)
+    tracked = [a for a in tracked if a not in latest] + actors
+    n.actor_ids = tracked[-_setting("NOTIFICATIONS_MAX_TRACKED_ACTORS", 1000):]
+    n.actor_id = actors[-1]
+
+
+def write(events):
+    """Persist a batch of events: bulk_update merged rows, bulk_create the rest."""
+    groups = coalesce(events)
+    if not groups:
+        return 0
+    now = timezone.now()
+    since = now - timedelta(seconds=_setting("NOTIFICATIONS_COALESCE_WINDOW", 3600))
+
+    with transaction.atomic():
+        existing = {}
+        recent = (
+            Notification.objects
+            .filter(
+                recipient_id__in={k[0] for k in groups},
+                verb__in={k[1] for k in groups},
+                read=False,
+                timestamp__gte=since,
+            )
+            .order_by("timestamp")  # newest wins below
+            .select_for_update()
+        )
+        for n in recent:
+            key = (n.recipient_id, n.verb, n.target_content_type_id, n.target_object_id)
+            if key in groups:
+                existing[key] = n
+
+        to_update, to_create = [], []
+        for key, actors in groups.items():
+            n = existing.get(key)
+            if n is not None:
+                merge_actors(n, actors)
+                n.timestamp = now
+                to_update.append(n)
+            else:
+                recipient_id, verb, ct_id, obj_id = key
+                to_create.append(Notification(
+                    recipient_id=recipient_id,
+                    actor_id=actors[-1],
+                    verb=verb,
+                    target_content_type_id=ct_id,
+                    target_object_id=obj_id,
+                    actor_count=len(actors),
+                    actor_ids=actors[-_setting("NOTIFICATIONS_MAX_TRACKED_ACTORS", 1000):],
+                ))
+        if to_update:
+            Notification.objects.bulk_update(to_update, ["actor", "actor_count", "actor_ids", "timestamp"])
+        if to_create:
+            Notification.objects.bulk_create(to_create)
+            count_created(to_create)  # merged rows were already unread
+        rows = to_update + to_create
+        transaction.on_commit(lambda: publish(rows))
+    return len(rows)
+
+
+def message_for(n):
+    """Lightweight payload pushed to live streams (no extra queries)."""
+    return {
+        "id": n.id,
+        "verb": n.verb,
+        "actor_id": n.actor_id,
+        "actor_count": n.actor_count,
+        "target_content_type_id": n.target_content_type_id,
+        "target_object_id": n.target_object_id,
+        "timestamp": n.timestamp.isoformat(),
+        "read": n.read,
+    }
+
+
+def publish(notifications):
+    broker = get_broker()
+    for n in notifications:
+        broker.publish(user_channel(n.recipient_id), message_for(n))
+
+
+class NotificationDispatcher:
+    def __init__(self):
+        self.queue = Queue()
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def enqueue(self, event):
+        if not _setting("NOTIFICATIONS_ASYNC", True):
+            write([event])
+            return
+        self.queue.put(event)
+        self.ensure_worker()
+        if self.queue.qsize() >= _setting("NOTIFICATIONS_BATCH_SIZE", 500):
+            self.wakeup.set()
+
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except Empty:
+                return events
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows written."""
+        events = self.drain()
+        if not events:
+            return 0
+        try:
+            return write(events)
+        except Exception:
+            logger.exception("Dropped %d notification event(s)", len(events))
+            return 0
+
+    def ensure_worker(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="notification-dispatcher", daemon=True
+                )
+                self.thread.start()
+
+    def run(self):
+        interval = _setting("NOTIFICATIONS_FLUSH_INTERVAL", 1.0)
+        while True:
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            self.flush()
+            close_old_connections()
+
+
+dispatcher = NotificationDispatcher()
+atexit.register(dispatcher.flush)
+
+
+def notify(recipient, actor, verb, target=None):
+    """Queue a notification; it is only enqueued if the current transaction commits."""
+    event = make_event(recipient, actor, verb, target)
+    transaction.on_commit(lambda: dispatcher.enqueue(event))
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Recompute CustomUser.unread_notifications_count from the Notification table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Users updated per statement.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        unread = Coalesce(
+            Subquery(
+                Notification.objects.filter(recipient=OuterRef("pk"), read=False)
+                .order_by()
+                .values("recipient")
+                .annotate(n=Count("id"))
+                .values("n"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+        updated = 0
+        last_id = 0
+        while True:
+            ids = list(
+                User.objects.filter(id__gt=last_id).order_by("id")
+                .values_list("id", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            updated += User.objects.filter(id__in=ids).update(unread_notifications_count=unread)
+        self.stdout.write(self.style.SUCCESS(f"Recounted unread notifications for {updated} user(s)."))
@@ -19,6 +19,15 @@ class Notification(models.Model):
     target = GenericForeignKey("target_content_type", "target_object_id")
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
+    # Coalesced events: `actor` is the latest of `actor_count` distinct actors.
+    # `actor_ids` keeps the most recent NOTIFICATIONS_MAX_TRACKED_ACTORS of
+    # them (latest last) so a repeat actor is not counted twice on merge
+    actor_count = models.PositiveIntegerField(default=1)
+    actor_ids = models.JSONField(default=list, blank=True, editable=False)
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            # inbox / unread-only pages: WHERE recipient = ? [AND read = ?] ORDER BY timestamp DESC
+            models.Index(fields=["recipient", "read", "-timestamp"]),
+        ]
@@ -0,0 +1,80 @@
+# notifications/pubsub.py
+"""
+Pub/sub used to push new notifications to open SSE streams.
+
+- publish() is sync and thread-safe (called from the dispatcher worker)
+- subscribe() is an async context manager yielding an asyncio.Queue
+- Backends are pluggable via NOTIFICATIONS_PUBSUB_BACKEND (dotted path);
+  InMemoryBroker only reaches subscribers in the same process, which is
+  enough for a single ASGI worker and for tests
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def user_channel(user_id):
+    return f"notifications:user:{user_id}"
+
+
+class BaseBroker:
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self.lock = threading.Lock()
+        self.subscribers = {}  # channel -> {(loop, queue), ...}
+
+    def publish(self, channel, message):
+        with self.lock:
+            targets = list(self.subscribers.get(channel, ()))
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+        return len(targets)
+
+    @staticmethod
+    def _offer(queue, message):
+        # A slow client loses the oldest message rather than growing without bound
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.max_queue_size))
+        with self.lock:
+            self.subscribers.setdefault(channel, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self.lock:
+                subs = self.subscribers.get(channel)
+                if subs is not None:
+                    subs.discard(entry)
+                    if not subs:
+                        del self.subscribers[channel]
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(
+                    settings, "NOTIFICATIONS_PUBSUB_BACKEND", "notifications.pubsub.InMemoryBroker"
+                )
+                _broker = import_string(path)()
+    return _broker
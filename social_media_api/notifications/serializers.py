@@ -10,10 +10,38 @@ class UserSummarySerializer(serializers.ModelSerializer):
         fields = ["id", "username", "email"]  # add avatar if you have it
 
 
+def resolve_targets(notifications):
+    """
+    Attach `resolved_target` to each notification with one in_bulk() query per
+    target model (instead of one GenericForeignKey lookup per row).
+    """
+    by_type = {}
+    for n in notifications:
+        if n.target_content_type_id is not None:
+            by_type.setdefault(n.target_content_type_id, set()).add(n.target_object_id)
+
+    found = {}
+    for ct_id, ids in by_type.items():
+        model = ContentType.objects.get_for_id(ct_id).model_class()  # cached per process
+        if model is not None:
+            found[ct_id] = model._default_manager.in_bulk(ids)
+
+    for n in notifications:
+        n.resolved_target = found.get(n.target_content_type_id, {}).get(n.target_object_id)
+    return notifications
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        return super().to_representation(resolve_targets(items))
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     recipient = UserSummarySerializer(read_only=True)
     actor = UserSummarySerializer(read_only=True)
     target_object = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
@@ -22,28 +50,52 @@ class NotificationSerializer(serializers.ModelSerializer):
             "recipient",
             "actor",
             "verb",
+            "actor_count",
+            "summary",
             "target_object",
             "timestamp",
             "read",
         ]
+        list_serializer_class = NotificationListSerializer
+
+    def get_summary(self, obj):
+        """e.g. "alice and 41 others liked your post"."""
+        others = obj.actor_count - 1
+        if others <= 0:
+            return f"{obj.actor.username} {obj.verb}"
+        noun = "other" if others == 1 else "others"
+        return f"{obj.actor.username} and {others} {noun} {obj.verb}"
 
     def get_target_object(self, obj):
         """Serialize the target of the notification."""
-        if obj.target is None:
+        if obj.target_content_type_id is None:
+            return None
+        # Batched by NotificationListSerializer; single objects fall back to the GFK
+        if hasattr(obj, "resolved_target"):
+            target = obj.resolved_target
+        else:
+            target = obj.target
+        if target is None:
             return None
+        model = ContentType.objects.get_for_id(obj.target_content_type_id).model
 
         # Example: handle known types (Post, Comment, etc.)
-        if obj.target_content_type.model == "post":
+        if model == "post":
             return {
-                "id": obj.target.id,
-                "title": getattr(obj.target, "title", None),
-                "content": getattr(obj.target, "content", None),
+                "id": target.id,
+                "title": getattr(target, "title", None),
+                "content": getattr(target, "content", None),
             }
-        elif obj.target_content_type.model == "comment":
+        elif model == "comment":
             return {
-                "id": obj.target.id,
-                "text": getattr(obj.target, "text", None),
+                "id": target.id,
+                "text": getattr(target, "text", None),
             }
 
         # Default if not explicitly handled
-        return {"id": obj.target.id, "type": obj.target_content_type.model}
+        return {"id": target.id, "type": model}
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """Empty body -> mark everything read; {"up_to_id": N} -> only notifications with id <= N."""
+    up_to_id = serializers.IntegerField(required=False, min_value=1)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .counters import adjust_unread
+from .models import Notification
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_unread(sender, instance, **kwargs):
+    if not instance.read:
+        adjust_unread({instance.recipient_id: -1})
@@ -1,3 +1,261 @@
-from django.test import TestCase
+"""
+Tests for the notification pipeline and inbox endpoints.
 
-# Create your tests here.
+Run:
+    python manage.py test notifications -v 2
+"""
+
+import asyncio
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import AuthToken
+from posts.models import Post
+from .dispatcher import NotificationDispatcher, make_event, write
+from .models import Notification
+from .pubsub import InMemoryBroker, get_broker, user_channel
+from .serializers import NotificationSerializer
+
+
+class DispatcherTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create(username="author")
+        cls.fans = [User.objects.create(username=f"fan{i}") for i in range(3)]
+        cls.post = Post.objects.create(author=cls.author, title="Hot post", content="Body")
+
+    def like_events(self, fans):
+        return [make_event(self.author, fan, "liked your post", self.post) for fan in fans]
+
+    def test_events_for_same_target_are_coalesced(self):
+        events = self.like_events(self.fans) + self.like_events(self.fans[:1])
+        self.assertEqual(write(events), 1)
+
+        n = Notification.objects.get()
+        self.assertEqual(n.actor_count, 3)
+        self.assertEqual(n.actor, self.fans[0])  # latest actor
+        self.assertEqual(
+            NotificationSerializer(n).data["summary"],
+            "fan0 and 2 others liked your post",
+        )
+
+    def test_later_events_merge_into_recent_unread_row(self):
+        write(self.like_events(self.fans[:1]))
+        write(self.like_events(self.fans[1:]))
+        self.assertEqual(Notification.objects.get().actor_count, 3)
+
+    def test_returning_actor_is_not_counted_again(self):
+        fan_a, fan_b = self.fans[:2]
+        for fan in (fan_a, fan_b, fan_a):
+            write(self.like_events([fan]))
+        n = Notification.objects.get()
+        self.assertEqual(n.actor_count, 2)
+        self.assertEqual(n.actor, fan_a)
+
+    def test_read_rows_are_not_merged(self):
+        write(self.like_events(self.fans[:1]))
+        Notification.objects.update(read=True)
+        write(self.like_events(self.fans[1:]))
+        self.assertEqual(Notification.objects.count(), 2)
+
+    @override_settings(NOTIFICATIONS_COALESCE_WINDOW=0)
+    def test_window_limits_merging(self):
+        write(self.like_events(self.fans[:1]))
+        write(self.like_events(self.fans[1:2]))
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_flush_writes_queued_events_in_one_batch(self):
+        dispatcher = NotificationDispatcher()
+        for event in self.like_events(self.fans):
+            dispatcher.queue.put(event)
+        self.assertEqual(dispatcher.flush(), 1)
+        self.assertEqual(dispatcher.flush(), 0)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class LikeNotificationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create(username="poster")
+        cls.fan = User.objects.create(username="liker")
+        cls.post = Post.objects.create(author=cls.author, title="Likeable", content="Body")
+
+    def test_like_queues_notification_after_commit(self):
+        self.client.force_authenticate(self.fan)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse("like-post", args=[self.post.id]))
+        self.assertFalse(Notification.objects.exists())  # not written inside the request
+
+        for callback in callbacks:
+            callback()
+        n = Notification.objects.get()
+        self.assertEqual((n.recipient, n.actor, n.target), (self.author, self.fan, self.post))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NotificationInboxTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create(username="inbox")
+        cls.fans = [User.objects.create(username=f"sender{i}") for i in range(6)]
+        for i, fan in enumerate(cls.fans):
+            post = Post.objects.create(author=cls.me, title=f"Post {i}", content="Body")
+            comment = post.comments.create(author=fan, content="Hi")
+            write([
+                make_event(cls.me, fan, "liked your post", post),
+                make_event(cls.me, fan, "commented on your post", comment),
+            ])
+        write([make_event(cls.me, cls.fans[0], "followed you")])
+
+    def setUp(self):
+        self.client.force_authenticate(self.me)
+
+    def page_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("notifications") + f"?page_size={page_size}")
+        self.assertEqual(res.status_code, 200)
+        return res, len(ctx.captured_queries)
+
+    def test_inbox_page_is_a_fixed_number_of_queries(self):
+        small, n_small = self.page_queries(3)
+        large, n_large = self.page_queries(13)
+        self.assertEqual(len(large.data["results"]), 13)
+        self.assertEqual(n_small, n_large)
+
+        by_verb = {r["verb"]: r["target_object"] for r in large.data["results"]}
+        self.assertIn("title", by_verb["liked your post"])
+        self.assertIsNone(by_verb["followed you"])
+
+    def test_unread_filter_and_cursor_mode(self):
+        Notification.objects.filter(verb="followed you").update(read=True)
+        res = self.client.get(reverse("notifications") + "?read=false&pagination=cursor&page_size=5")
+        self.assertEqual(len(res.data["results"]), 5)
+        self.assertTrue(all(not r["read"] for r in res.data["results"]))
+        res = self.client.get(res.data["next"])
+        self.assertEqual(len(res.data["results"]), 5)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UnreadCounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create(username="badge")
+        cls.fans = [User.objects.create(username=f"poker{i}") for i in range(4)]
+        write([make_event(cls.me, fan, f"poked you #{i}") for i, fan in enumerate(cls.fans)])
+
+    def setUp(self):
+        self.client.force_authenticate(self.me)
+
+    def unread(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("notifications-unread-count"))
+        self.assertEqual(len(ctx.captured_queries), 0)  # served from request.user
+        return res.data["unread"]
+
+    def test_counter_follows_created_merged_and_deleted_rows(self):
+        self.me.refresh_from_db()
+        self.assertEqual(self.unread(), 4)
+
+        write([make_event(self.me, self.fans[1], "poked you #0")])  # merged, still one row
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.unread_notifications_count, 4)
+
+        self.fans[2].delete()  # cascades to that actor's notification
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.unread_notifications_count, 3)
+
+    def test_mark_read_up_to_id_then_all(self):
+        ids = sorted(Notification.objects.values_list("id", flat=True))
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(reverse("notifications-mark-read"), {"up_to_id": ids[1]}, format="json")
+        self.assertEqual(res.data, {"marked_read": 2, "unread": 2})
+        self.assertEqual(
+            len([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]), 2
+        )  # rows + counter
+
+        res = self.client.post(reverse("notifications-mark-read"), {}, format="json")
+        self.assertEqual(res.data, {"marked_read": 2, "unread": 0})
+
+    def test_recount_repairs_drift(self):
+        get_user_model().objects.filter(pk=self.me.pk).update(unread_notifications_count=40)
+        call_command("recount_unread_notifications", stdout=StringIO())
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.unread_notifications_count, 4)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    NOTIFICATIONS_STREAM_HEARTBEAT=0.05,
+    NOTIFICATIONS_STREAM_MAX_SECONDS=0.3,
+)
+class NotificationStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.me = User.objects.create(username="listener")
+        cls.fan = User.objects.create(username="streamer")
+        _, cls.token_key = AuthToken.issue(cls.me)
+        write([make_event(cls.me, cls.fan, "waved at you")])
+        cls.earlier = Notification.objects.get()
+
+    def test_in_memory_broker_reaches_subscriber(self):
+        async def scenario():
+            broker = InMemoryBroker()
+            async with broker.subscribe("c") as queue:
+                self.assertEqual(broker.publish("c", {"id": 1}), 1)
+                return await asyncio.wait_for(queue.get(), 1)
+
+        self.assertEqual(asyncio.run(scenario()), {"id": 1})
+        self.assertEqual(InMemoryBroker().publish("c", {}), 0)
+
+    async def test_stream_requires_authentication(self):
+        res = await self.async_client.get(reverse("notifications-stream"))
+        self.assertEqual(res.status_code, 401)
+
+    async def stream_token(self):
+        res = await self.async_client.post(
+            reverse("notifications-stream-token"), headers={"authorization": f"Token {self.token_key}"}
+        )
+        self.assertEqual(res.status_code, 200)
+        return res.json()["stream_token"]
+
+    async def test_stream_rejects_api_token_in_url(self):
+        res = await self.async_client.get(reverse("notifications-stream") + f"?token={self.token_key}")
+        self.assertEqual(res.status_code, 401)
+        res = await self.async_client.get(reverse("notifications-stream") + f"?stream_token={self.token_key}")
+        self.assertEqual(res.status_code, 401)
+
+    async def test_expired_stream_token_is_rejected(self):
+        stream_token = await self.stream_token()
+        with self.settings(NOTIFICATIONS_STREAM_TOKEN_TTL=-1):
+            res = await self.async_client.get(reverse("notifications-stream") + f"?stream_token={stream_token}")
+        self.assertEqual(res.status_code, 401)
+
+    async def test_stream_replays_missed_then_pushes_published(self):
+        res = await self.async_client.get(
+            reverse("notifications-stream") + f"?stream_token={await self.stream_token()}",
+            headers={"last-event-id": str(self.earlier.id - 1)},
+        )
+        self.assertEqual(res["Content-Type"], "text/event-stream")
+        chunks = aiter(res.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b"retry:"))
+        self.assertIn(f"id: {self.earlier.id}".encode(), await anext(chunks))
+
+        get_broker().publish(user_channel(self.me.id), {"id": 999, "verb": "live"})
+        chunk = await anext(chunks)
+        while chunk.startswith(b":"):  # skip keepalives
+            chunk = await anext(chunks)
+        self.assertIn(b'"verb": "live"', chunk)
+        async for chunk in chunks:  # stream ends at NOTIFICATIONS_STREAM_MAX_SECONDS
+            self.assertTrue(chunk.startswith(b":"))
@@ -1,9 +1,6 @@
-from .models import Notification
+from .dispatcher import notify
+
 
 def create_notification(recipient, actor, verb, target=None):
-    Notification.objects.create(
-        recipient=recipient,
-        actor=actor,
-        verb=verb,
-        target=target
-    )
+    # Queued and written in batches by notifications/dispatcher.py
+    notify(recipient, actor, verb, target)
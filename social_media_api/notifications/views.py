@@ -1,13 +1,164 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 
 # Create your views here.
-from rest_framework import generics, permissions
+from rest_framework import exceptions, generics, permissions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from posts.pagination import DefaultPagination
+from .counters import mark_read
+from .dispatcher import message_for
+from .pubsub import get_broker, user_channel
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import NotificationSerializer, MarkReadSerializer
 
 class NotificationListView(generics.ListAPIView):
+    """
+    GET /api/notifications/ -> the user's inbox, newest first (paginated)
+    - ?read=false -> unread only (served by the (recipient, read, -timestamp) index)
+    - Targets are resolved per page in one query per target type
+    """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DefaultPagination
+    keyset_field = "timestamp"
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        qs = (
+            Notification.objects
+            .filter(recipient=self.request.user)
+            .select_related("actor", "recipient")
+            .order_by("-timestamp", "-id")
+        )
+        read = self.request.query_params.get("read")
+        if read in ("true", "false"):
+            qs = qs.filter(read=(read == "true"))
+        return qs
+
+
+class UnreadCountView(APIView):
+    """GET /api/notifications/unread-count/ -> {"unread": n} straight from the user row (no COUNT)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"unread": request.user.unread_notifications_count})
+
+
+class MarkReadView(generics.GenericAPIView):
+    """POST /api/notifications/mark-read/ [{"up_to_id": N}] -> one UPDATE on Notification.read."""
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = MarkReadSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = mark_read(request.user, serializer.validated_data.get("up_to_id"))
+        request.user.refresh_from_db(fields=["unread_notifications_count"])
+        return Response({"marked_read": updated, "unread": request.user.unread_notifications_count})
+
+
+#......................... live stream (SSE over ASGI).................................
+STREAM_TOKEN_SALT = "notifications.stream"
+
+
+def _stream_token_ttl():
+    return getattr(settings, "NOTIFICATIONS_STREAM_TOKEN_TTL", 60)
+
+
+class StreamTokenView(APIView):
+    """
+    POST /api/notifications/stream-token/ -> {"stream_token": ..., "expires_in": seconds}
+    EventSource cannot send headers: this signed ticket only opens the stream and
+    expires after NOTIFICATIONS_STREAM_TOKEN_TTL, so the API token never goes in a URL.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        stream_token = signing.dumps(request.user.pk, salt=STREAM_TOKEN_SALT)
+        return Response({"stream_token": stream_token, "expires_in": _stream_token_ttl()})
+
+
+def _stream_user(request):
+    """?stream_token= from StreamTokenView, else the API's DRF authentication classes (Authorization header)."""
+    stream_token = request.GET.get("stream_token")
+    if stream_token:
+        try:
+            user_id = signing.loads(stream_token, salt=STREAM_TOKEN_SALT, max_age=_stream_token_ttl())
+        except signing.BadSignature:  # includes SignatureExpired
+            return None
+        return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+    drf_request = Request(request)
+    for auth_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = auth_class().authenticate(drf_request)
+        except exceptions.AuthenticationFailed:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+def _missed(user_id, last_id, limit=100):
+    rows = Notification.objects.filter(recipient_id=user_id, id__gt=last_id).order_by("id")[:limit]
+    return [message_for(n) for n in rows]
+
+
+def _sse(message):
+    return f"id: {message['id']}\nevent: notification\ndata: {json.dumps(message)}\n\n"
+
+
+async def _events(user_id, last_id):
+    heartbeat = getattr(settings, "NOTIFICATIONS_STREAM_HEARTBEAT", 15)
+    # Recycle long streams so proxies/workers can rebalance; clients reconnect with Last-Event-ID
+    max_seconds = getattr(settings, "NOTIFICATIONS_STREAM_MAX_SECONDS", 300)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+
+    # Subscribe before replaying so nothing falls between the two
+    async with get_broker().subscribe(user_channel(user_id)) as queue:
+        yield "retry: 3000\n\n"
+        if last_id is not None:
+            for message in await sync_to_async(_missed)(user_id, last_id):
+                yield _sse(message)
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(message)
+
+
+async def notification_stream(request):
+    """
+    GET /api/notifications/stream/ -> text/event-stream of the user's new notifications.
+    Idle connections only hold a queue in the pub/sub broker, so serve this under ASGI.
+    """
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+
+    return StreamingHttpResponse(
+        _events(user.pk, last_id),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
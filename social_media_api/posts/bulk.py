@@ -0,0 +1,121 @@
+# posts/bulk.py
+"""
+Bulk creation of posts and comments (imports / migrations from other platforms).
+
+- Every item goes through the regular serializer validation (validate_title,
+  validate_content, ...); invalid items are reported by index and skipped
+- Valid items are written with bulk_create in POSTS_BULK_CHUNK_SIZE chunks
+  (500) inside one transaction; a request takes at most POSTS_BULK_MAX_ITEMS
+  items (1000)
+- bulk_create sends no post_save, so what posts/signals.py does per row is
+  done here once per batch: comments_count, scores, timelines, search index
+  and the response cache
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import ranking, response_cache, timeline
+from .models import Post, Comment
+from .search import get_search_backend
+from .serializers import CommentSerializer
+
+
+def max_items():
+    return getattr(settings, "POSTS_BULK_MAX_ITEMS", 1000)
+
+
+def chunk_size():
+    return getattr(settings, "POSTS_BULK_CHUNK_SIZE", 500)
+
+
+class BulkError(Exception):
+    """The payload as a whole is unusable (not a list, empty, too large)."""
+
+
+def check_payload(items):
+    if not isinstance(items, list):
+        raise BulkError("Expected a list of items.")
+    if not items:
+        raise BulkError("No items given.")
+    if len(items) > max_items():
+        raise BulkError(f"Too many items: at most {max_items()} per request.")
+
+
+class BulkCommentSerializer(CommentSerializer):
+    """CommentSerializer for /api/comments/bulk/: every item names its post."""
+
+    def validate(self, attrs):
+        if "post" not in attrs:
+            raise serializers.ValidationError({"post": ["This field is required."]})
+        return attrs
+
+
+def validate_items(serializer_class, items, context):
+    """
+    Run the serializer's validation on each item with one serializer instance
+    (fields are built once). Returns ([(index, validated_data)], [errors]).
+    """
+    child = serializer_class(context=context)
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, child.run_validation(item)))
+        except serializers.ValidationError as exc:
+            errors.append({"index": index, "errors": exc.detail})
+    return valid, errors
+
+
+def create_posts(author, validated):
+    """Insert posts for `author`; returns them with primary keys set."""
+    posts = [Post(author=author, **data) for data in validated]
+    with transaction.atomic():
+        Post.objects.bulk_create(posts, batch_size=chunk_size())
+        ranking.save_scores([ranking.initial_score(post) for post in posts])
+        response_cache.invalidate(response_cache.LIST_VERSION_KEY)
+        transaction.on_commit(lambda: timeline.fan_out_posts(posts))
+        backend = get_search_backend()
+        if backend is not None:
+            transaction.on_commit(lambda: backend.safe_index(posts))
+    return posts
+
+
+def bump_comment_counts(post_ids):
+    """comments_count += n for each post: one UPDATE per distinct n."""
+    by_delta = defaultdict(list)
+    for post_id, delta in Counter(post_ids).items():
+        by_delta[delta].append(post_id)
+    now = timezone.now()
+    for delta, ids in by_delta.items():
+        Post.objects.filter(pk__in=ids).update(
+            comments_count=F("comments_count") + delta, last_modified=now
+        )
+    for post_id in set(post_ids):
+        response_cache.invalidate_post(post_id)
+
+
+def create_comments(author, validated):
+    """Insert comments by `author` (each item's "post" already resolved)."""
+    comments = [Comment(author=author, **data) for data in validated]
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments, batch_size=chunk_size())
+        bump_comment_counts([comment.post_id for comment in comments])
+    return comments
+
+
+def post_ids_in(items):
+    """The integer "post" values of a comment payload, for one in_bulk()."""
+    ids = set()
+    for item in items:
+        value = item.get("post") if isinstance(item, dict) else None
+        if isinstance(value, bool):
+            continue
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            continue
+    return ids
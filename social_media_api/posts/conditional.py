@@ -0,0 +1,115 @@
+# posts/conditional.py
+"""
+Conditional GET (ETag / Last-Modified) for API views.
+
+- Detail validators come from a narrow query (one timestamp column), so
+  If-None-Match / If-Modified-Since is answered with 304 before the object is
+  loaded or serialized
+- Collection validators come from the page being served: its rows' (pk,
+  timestamp), the pagination envelope (links, count when the paginator has
+  one) and the query string. No aggregate over the whole filtered table;
+  a 304 still skips serialization
+- The actual evaluation is django.utils.cache.get_conditional_response
+  (RFC 9110 order, including If-Match / If-Unmodified-Since -> 412)
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def make_etag(request, *parts):
+    """
+    Strong ETag over `parts` plus the negotiated format (JSON vs browsable API)
+    and the user (posts carry a per-user liked_by_me).
+    """
+    renderer = getattr(request, "accepted_renderer", None)
+    user_id = getattr(getattr(request, "user", None), "pk", None)
+    raw = "|".join(str(p) for p in (getattr(renderer, "format", ""), user_id, *parts))
+    return '"%s"' % hashlib.md5(raw.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def set_validators(response, etag, last_modified=None):
+    if etag:
+        response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def precondition_response(request, etag, last_modified=None):
+    """A 304 (or 412) when the request's conditional headers settle it, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def page_validators(request, rows, field, envelope=None):
+    """(etag, last_modified) of a served page: each row's (pk, field) + envelope + query string."""
+    stamps = [(row.pk, getattr(row, field)) for row in rows]
+    last_modified = max((modified for _, modified in stamps), default=None)
+    return make_etag(request, request.get_full_path(), envelope, *stamps), last_modified
+
+
+class ConditionalGetMixin:
+    """
+    list()/retrieve() for generic viewsets that return 304 Not Modified early.
+    `modified_field` must change whenever an object's representation does.
+    """
+    modified_field = "updated_at"
+
+    def get_validator_queryset(self):
+        # Same rows the view serves; prefetches are useless for values()
+        return self.get_queryset().prefetch_related(None)
+
+    def get_object_validators(self):
+        """(etag, last_modified) from a single-column lookup, or (None, None) if missing."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = (
+            self.get_validator_queryset()
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list("pk", self.modified_field)
+            .first()
+        )
+        if row is None:
+            return None, None  # let retrieve() raise the 404
+        pk, modified = row
+        return make_etag(self.request, pk, modified), modified
+
+    def get_page_envelope(self, page):
+        """Everything the paginated payload holds besides "results" (links, count)."""
+        if page is None:
+            return None
+        envelope = dict(self.get_paginated_response([]).data)
+        envelope.pop("results", None)
+        return envelope
+
+    def retrieve(self, request, *args, **kwargs):
+        etag, last_modified = self.get_object_validators()
+        if etag is not None:
+            early = precondition_response(request, etag, last_modified)
+            if early is not None:
+                return early
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        etag, last_modified = page_validators(
+            request, rows, self.modified_field, self.get_page_envelope(page)
+        )
+        early = precondition_response(request, etag, last_modified)
+        if early is not None:
+            return early
+
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(self.get_serializer(rows, many=True).data)
+        return set_validators(response, etag, last_modified)
@@ -0,0 +1,106 @@
+# posts/counters.py
+"""
+Post.comments_count / Post.likes_count bookkeeping.
+
+- bump(): one UPDATE ... SET n = MAX(n + delta, 0) in the caller's
+  transaction; rows that predate the counters (count still 0) can be removed
+  without the PositiveIntegerField going negative
+- Comments and likes removed together with their post (a cascade) are not
+  counted down one by one: the post is marked in pre_delete and the per-row
+  receivers skip it (posts/signals.py)
+- reconcile(): recounts from the Comment and Like tables in batches and
+  writes only the posts that drifted; `manage.py reconcile_post_counters`
+  (run it once after deploying the counters onto an existing database)
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from . import response_cache
+from .models import Post, Comment, Like
+
+BATCH_SIZE = 5000
+
+_deleting = threading.local()
+_UNMARKED = object()
+
+
+def bump(post_id, field, delta):
+    Post.objects.filter(pk=post_id).update(
+        **{field: Greatest(F(field) + delta, Value(0))}, last_modified=timezone.now()
+    )
+    response_cache.invalidate_post(post_id)
+
+
+def _marks():
+    marks = getattr(_deleting, "marks", None)
+    if marks is None:
+        marks = _deleting.marks = {}
+    return marks
+
+
+def mark_deleting(post_id, origin):
+    """`post_id` goes in the cascade `origin` started: its rows need no upkeep."""
+    _marks()[post_id] = origin
+
+
+def unmark_deleting(post_id):
+    _marks().pop(post_id, None)
+
+
+def is_deleting(post_id, origin):
+    # Matching the origin ignores a mark left behind by a delete that failed
+    return _marks().get(post_id, _UNMARKED) is origin
+
+
+def _count_of(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(n=Count("id"))
+            .values("n"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def reconcile(batch_size=BATCH_SIZE, dry_run=False):
+    """Repair drifted counters; returns the number of posts that had drifted."""
+    fixed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Post.objects.filter(id__gt=last_id).order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        drifted = list(
+            Post.objects.filter(id__in=ids)
+            .annotate(real_comments=_count_of(Comment), real_likes=_count_of(Like))
+            .filter(~Q(comments_count=F("real_comments")) | ~Q(likes_count=F("real_likes")))
+            .only("id", "comments_count", "likes_count")
+        )
+        if not drifted:
+            continue
+        fixed += len(drifted)
+        if dry_run:
+            continue
+        now = timezone.now()
+        for post in drifted:
+            post.comments_count = post.real_comments
+            post.likes_count = post.real_likes
+            post.last_modified = now
+        with transaction.atomic():
+            Post.objects.bulk_update(drifted, ["comments_count", "likes_count", "last_modified"])
+        for post in drifted:
+            response_cache.invalidate_post(post.pk)
+    return fixed
@@ -0,0 +1,110 @@
+# posts/export.py
+"""
+Streaming export of one user's posts, comments and likes (NDJSON or CSV).
+
+- Rows are read with values_list().iterator(chunk_size=POSTS_EXPORT_CHUNK_SIZE)
+  (2000): a server-side cursor on PostgreSQL, chunked fetches elsewhere; no
+  model instances and no full result set in memory
+- Output is produced a buffer (~64 KB) at a time, so memory stays flat however
+  many rows the account has
+- NDJSON: one object per line with a "type" key; CSV: one table, COLUMNS, with
+  the cells a row type does not have left empty
+- Used by ExportView (/api/export/) and `manage.py export_user_data`
+"""
+import csv
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import serializers
+
+from social_media_api.fastjson import dumps
+from .models import Post, Comment, Like
+
+KINDS = ("posts", "comments", "likes")
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+COLUMNS = (
+    "type", "id", "post_id", "title", "content",
+    "created_at", "updated_at", "comments_count", "likes_count",
+)
+BUFFER_SIZE = 64 * 1024
+
+
+def chunk_size():
+    return getattr(settings, "POSTS_EXPORT_CHUNK_SIZE", 2000)
+
+
+def records(user, kinds=KINDS):
+    """Yield one dict per exported row, kind by kind, each in id order."""
+    datetime_repr = serializers.DateTimeField().to_representation
+    size = chunk_size()
+    if "posts" in kinds:
+        rows = (
+            Post.objects.filter(author=user).order_by("id")
+            .values_list("id", "title", "content", "created_at", "updated_at", "comments_count", "likes_count")
+        )
+        for pk, title, content, created_at, updated_at, comments_count, likes_count in rows.iterator(size):
+            yield {
+                "type": "post", "id": pk, "title": title, "content": content,
+                "created_at": datetime_repr(created_at), "updated_at": datetime_repr(updated_at),
+                "comments_count": comments_count, "likes_count": likes_count,
+            }
+    if "comments" in kinds:
+        rows = (
+            Comment.objects.filter(author=user).order_by("id")
+            .values_list("id", "post_id", "content", "created_at", "updated_at")
+        )
+        for pk, post_id, content, created_at, updated_at in rows.iterator(size):
+            yield {
+                "type": "comment", "id": pk, "post_id": post_id, "content": content,
+                "created_at": datetime_repr(created_at), "updated_at": datetime_repr(updated_at),
+            }
+    if "likes" in kinds:
+        rows = Like.objects.filter(user=user).order_by("id").values_list("id", "post_id", "created_at")
+        for pk, post_id, created_at in rows.iterator(size):
+            yield {"type": "like", "id": pk, "post_id": post_id, "created_at": datetime_repr(created_at)}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def _lines(rows, fmt):
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(COLUMNS).encode()
+        for row in rows:
+            yield writer.writerow([row.get(column, "") for column in COLUMNS]).encode()
+    else:
+        for row in rows:
+            yield dumps(row) + b"\n"
+
+
+def stream(user, fmt="ndjson", kinds=KINDS, buffer_size=BUFFER_SIZE):
+    """Yield the export as bytes, roughly `buffer_size` at a time."""
+    buffer, size = [], 0
+    for line in _lines(records(user, kinds), fmt):
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def astream(chunks):
+    """
+    Async view of a sync chunk iterator for ASGI, which would otherwise read a
+    sync StreamingHttpResponse into one list. Chunks are pulled one by one on
+    the same thread, so the database cursor stays on its connection.
+    """
+    chunks = iter(chunks)
+    done = object()
+    while True:
+        chunk = await sync_to_async(next)(chunks, done)
+        if chunk is done:
+            return
+        yield chunk
@@ -0,0 +1,113 @@
+# posts/fastpath.py
+"""
+Serializer-free rendering for post list endpoints (/api/posts/, /api/feed/).
+
+- The page is fetched with values_list(named=True): only the columns
+  PostSerializer shows, no model instances
+- Rows become dicts in PostSerializer's exact key order and formatting
+  (datetimes go through DRF's own DateTimeField.to_representation), so the
+  JSON is byte-identical; posts/tests.py holds the parity test
+- POSTS_FAST_LIST = False (or a view's `fast_list = False`) turns it off;
+  any other serializer class or action keeps the regular path
+- Keep ROW_FIELDS / render_row in sync when PostSerializer changes
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+from .likes import liked_post_ids
+from .serializers import PostSerializer
+
+# "pk" keeps the rows usable by the keyset paginator and the response cache
+ROW_FIELDS = (
+    "pk", "id", "author_id", "author__username", "author__profile_picture",
+    "title", "content", "created_at", "updated_at", "comments_count", "likes_count",
+    "last_modified",
+)
+
+
+def compile_renderer(liked=frozenset()):
+    """row -> dict function with the per-request lookups done once."""
+    datetime_repr = serializers.DateTimeField().to_representation
+    storage = get_user_model()._meta.get_field("profile_picture").storage
+
+    def avatar(name):
+        # Mirrors UserBriefSerializer.get_avatar
+        if not name:
+            return None
+        try:
+            return storage.url(name)
+        except Exception:
+            return None
+
+    def render_row(row):
+        return {
+            "id": row.id,
+            "author": {
+                "id": row.author_id,
+                "username": row.author__username,
+                "avatar": avatar(row.author__profile_picture),
+            },
+            "title": row.title,
+            "content": row.content,
+            "created_at": datetime_repr(row.created_at),
+            "updated_at": datetime_repr(row.updated_at),
+            "comments_count": row.comments_count,
+            "likes_count": row.likes_count,
+            "liked_by_me": row.id in liked,
+        }
+
+    return render_row
+
+
+class PostRowSerializer:
+    """Read-only stand-in for PostSerializer over ROW_FIELDS rows."""
+
+    def __init__(self, instance, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @cached_property
+    def data(self):
+        rows = self.instance if self.many else [self.instance]
+        # Same per-request memo as PostSerializer.liked_by_me
+        liked = liked_post_ids(self.context.get("request"), [row.id for row in rows])
+        render_row = compile_renderer(liked)
+        if self.many:
+            return [render_row(row) for row in rows]
+        return render_row(self.instance)
+
+
+def is_row(obj):
+    # Named values_list() rows are tuples; model instances never are
+    return isinstance(obj, tuple)
+
+
+class FastPostListMixin:
+    """List views over Post: paginate plain rows and render them without PostSerializer."""
+    fast_list = True
+
+    def use_fast_list(self):
+        return (
+            self.fast_list
+            and getattr(settings, "POSTS_FAST_LIST", True)
+            and getattr(self, "action", "list") == "list"
+            and self.get_serializer_class() is PostSerializer
+        )
+
+    def paginate_queryset(self, queryset):
+        if self.use_fast_list() and queryset.model is PostSerializer.Meta.model:
+            # Annotations come along: the keyset paginator may seek on them
+            queryset = queryset.values_list(*ROW_FIELDS, *queryset.query.annotations, named=True)
+        return super().paginate_queryset(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        instance = args[0] if args else kwargs.get("instance")
+        many = kwargs.get("many", False)
+        if instance is not None and (
+            is_row(instance) or (many and isinstance(instance, list) and instance and is_row(instance[0]))
+        ):
+            return PostRowSerializer(instance, many=many, context=self.get_serializer_context())
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,26 @@
+from django.db.models import F
+from rest_framework import filters
+
+from .search import SearchUnavailable, get_search_backend
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """
+    ?search=<q> through the full-text backend (posts/search.py), ranked best
+    first unless ?ordering= is given. Falls back to SearchFilter's icontains
+    over `search_fields` when no backend is usable.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        backend = get_search_backend() if query else None
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        try:
+            queryset = backend.search(queryset, query)
+        except SearchUnavailable:
+            return super().filter_queryset(request, queryset, view)
+        if "ordering" not in request.query_params:
+            # Posts matched only by author have no rank: after the text matches
+            queryset = queryset.order_by(F("search_rank").asc(nulls_last=True), "-created_at", "-id")
+        return queryset
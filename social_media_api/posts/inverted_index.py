@@ -0,0 +1,312 @@
+# posts/inverted_index.py
+"""
+Self-contained in-memory inverted index over Post.title / Post.content.
+
+Use it as the ?search= engine with
+    POSTS_SEARCH_BACKEND = "posts.inverted_index.InvertedIndexBackend"
+
+- Posting lists are compact arrays (uint32 doc numbers + uint16 term freqs);
+  documents get increasing internal numbers, so adds are appends and an
+  update/delete just tombstones the old number
+- Ranking is BM25 (title terms count POSTS_SEARCH_TITLE_BOOST times); all
+  query words must match, as with the database backends
+- Each worker loads the index at startup, in a background thread started by
+  preload() from wsgi.py / asgi.py: from the snapshot at POSTS_SEARCH_SNAPSHOT
+  (mmap'd, then caught up by updated_at) or from the DB. Searches arriving
+  while it loads fall back to icontains instead of waiting for it
+- post_save/post_delete keep this process's copy current (posts/signals.py);
+  `manage.py rebuild_search_index` rebuilds it and writes a fresh snapshot
+"""
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Post
+from .search import WORD_RE, BaseSearchBackend, SearchUnavailable, get_search_backend
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PIDX1\n"
+K1, B = 1.2, 0.75
+
+
+def tokenize(text):
+    return [w.lower() for w in WORD_RE.findall(text or "")]
+
+
+class InvertedIndex:
+    def __init__(self, title_boost=2):
+        self.title_boost = title_boost
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        self.terms = {}          # term -> term id
+        self.doc_nos = []        # term id -> array('I') of doc numbers (ascending)
+        self.freqs = []          # term id -> array('H') of term frequencies
+        self.doc_post_ids = array("Q")   # doc number -> post id
+        self.doc_lengths = array("I")    # doc number -> weighted token count
+        self.alive = bytearray()         # doc number -> 1 until tombstoned
+        self.live = {}           # post id -> current doc number
+        self.total_length = 0
+        self.built_at = None
+        self.loaded = False
+
+    # ----- updates -----
+    def _postings(self, term):
+        term_id = self.terms.get(term)
+        if term_id is None:
+            term_id = self.terms[term] = len(self.doc_nos)
+            self.doc_nos.append(array("I"))
+            self.freqs.append(array("H"))
+        elif not isinstance(self.doc_nos[term_id], array):
+            # Read-only view into the mmap'd snapshot: copy on first write
+            self.doc_nos[term_id] = array("I", self.doc_nos[term_id])
+            self.freqs[term_id] = array("H", self.freqs[term_id])
+        return self.doc_nos[term_id], self.freqs[term_id]
+
+    def add(self, post_id, title, content):
+        counts = {}
+        for term in tokenize(title):
+            counts[term] = counts.get(term, 0) + self.title_boost
+        for term in tokenize(content):
+            counts[term] = counts.get(term, 0) + 1
+        with self.lock:
+            self.remove(post_id)
+            doc_no = len(self.doc_post_ids)
+            length = sum(counts.values())
+            self.doc_post_ids.append(post_id)
+            self.doc_lengths.append(length)
+            self.alive.append(1)
+            for term, tf in counts.items():
+                docs, tfs = self._postings(term)
+                docs.append(doc_no)
+                tfs.append(min(tf, 0xFFFF))
+            self.live[post_id] = doc_no
+            self.total_length += length
+
+    def remove(self, post_id):
+        with self.lock:
+            doc_no = self.live.pop(post_id, None)
+            if doc_no is not None:
+                self.alive[doc_no] = 0
+                self.total_length -= self.doc_lengths[doc_no]
+
+    # ----- querying -----
+    def search(self, query, limit):
+        """Post ids containing every query word, best BM25 score first."""
+        words = set(tokenize(query))
+        if not words:
+            return []
+        with self.lock:
+            n_docs = len(self.live)
+            if not n_docs:
+                return []
+            avgdl = self.total_length / n_docs
+            lists = []
+            for word in words:
+                term_id = self.terms.get(word)
+                if term_id is None:
+                    return []
+                lists.append((self.doc_nos[term_id], self.freqs[term_id]))
+            lists.sort(key=lambda pl: len(pl[0]))  # intersect starting from the rarest term
+
+            alive = self.alive
+            scores = None
+            for docs, tfs in lists:
+                df = sum(alive[d] for d in docs)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                term_scores = {}
+                for doc_no, tf in zip(docs, tfs):
+                    if not alive[doc_no] or (scores is not None and doc_no not in scores):
+                        continue
+                    norm = K1 * (1 - B + B * self.doc_lengths[doc_no] / avgdl)
+                    term_scores[doc_no] = idf * tf * (K1 + 1) / (tf + norm)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {d: s + term_scores[d] for d, s in scores.items() if d in term_scores}
+                if not scores:
+                    return []
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+            return [self.doc_post_ids[d] for d, _ in ranked]
+
+    # ----- building / snapshots -----
+    def build(self, queryset, chunk_size=2000):
+        with self.lock:
+            self.clear()
+            self.built_at = timezone.now()
+            for post in queryset.only("id", "title", "content").iterator(chunk_size=chunk_size):
+                self.add(post.id, post.title, post.content)
+            self.loaded = True
+
+    def save(self, path):
+        """Write a compacted snapshot (live documents only) atomically."""
+        with self.lock:
+            renumber = {}
+            post_ids, lengths = array("Q"), array("I")
+            for post_id, doc_no in sorted(self.live.items(), key=lambda item: item[1]):
+                renumber[doc_no] = len(post_ids)
+                post_ids.append(post_id)
+                lengths.append(self.doc_lengths[doc_no])
+            terms, starts = [], array("Q", [0])
+            all_docs, all_tfs = array("I"), array("H")
+            for term, term_id in self.terms.items():
+                kept = [(renumber[d], tf) for d, tf in zip(self.doc_nos[term_id], self.freqs[term_id]) if d in renumber]
+                if not kept:
+                    continue
+                terms.append(term)
+                all_docs.extend(d for d, _ in kept)
+                all_tfs.extend(tf for _, tf in kept)
+                starts.append(len(all_docs))
+            built_at = (self.built_at or timezone.now()).isoformat()
+
+        sections = [post_ids, lengths, starts, all_docs, all_tfs]
+        header = json.dumps({
+            "built_at": built_at,
+            "terms": terms,
+            "title_boost": self.title_boost,
+            "sections": [[s.typecode, len(s)] for s in sections],
+        }).encode("utf-8")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(MAGIC)
+            fh.write(struct.pack("<Q", len(header)))
+            fh.write(header)
+            for section in sections:
+                fh.write(b"\0" * (-fh.tell() % 8))  # keep every array 8-byte aligned
+                section.tofile(fh)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Map a snapshot; posting lists stay zero-copy views until they are written."""
+        with open(path, "rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a post search snapshot")
+        offset = len(MAGIC)
+        (header_len,) = struct.unpack_from("<Q", mm, offset)
+        offset += 8
+        header = json.loads(mm[offset:offset + header_len])
+        offset += header_len
+
+        view = memoryview(mm)
+        sections = []
+        for typecode, length in header["sections"]:
+            offset += -offset % 8
+            size = array(typecode).itemsize * length
+            sections.append(view[offset:offset + size].cast(typecode))
+            offset += size
+        post_ids, lengths, starts, all_docs, all_tfs = sections
+
+        with self.lock:
+            self.clear()
+            self.title_boost = header["title_boost"]
+            self.doc_post_ids = array("Q", post_ids)
+            self.doc_lengths = array("I", lengths)
+            self.alive = bytearray(b"\x01" * len(self.doc_post_ids))
+            self.live = {post_id: doc_no for doc_no, post_id in enumerate(self.doc_post_ids)}
+            self.total_length = sum(self.doc_lengths)
+            for term_id, term in enumerate(header["terms"]):
+                self.terms[term] = term_id
+                self.doc_nos.append(all_docs[starts[term_id]:starts[term_id + 1]])
+                self.freqs.append(all_tfs[starts[term_id]:starts[term_id + 1]])
+            self.built_at = datetime.fromisoformat(header["built_at"])
+            self.loaded = True
+        self._mmap = mm  # keep the mapping alive while views exist
+
+
+_index = InvertedIndex()
+
+
+def get_index():
+    return _index
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """BaseSearchBackend over the process-wide InvertedIndex (no database work per search)."""
+
+    def __init__(self, index=None):
+        self.idx = index or get_index()
+        self.idx.title_boost = getattr(settings, "POSTS_SEARCH_TITLE_BOOST", self.idx.title_boost)
+
+    @staticmethod
+    def snapshot_path():
+        return getattr(settings, "POSTS_SEARCH_SNAPSHOT", None)
+
+    def ensure_loaded(self, blocking=True):
+        """Load the index unless it is; False if another thread is loading it and not `blocking`."""
+        if self.idx.loaded:
+            return True
+        if not self.idx.lock.acquire(blocking=blocking):
+            return False
+        try:
+            if self.idx.loaded:
+                return True
+            path = self.snapshot_path()
+            if path and os.path.exists(path):
+                self.idx.load(path)
+                # Catch up with posts written since the snapshot...
+                for post in Post.objects.filter(updated_at__gte=self.idx.built_at).only("id", "title", "content"):
+                    self.idx.add(post.id, post.title, post.content)
+                # ...and tombstone those deleted since (one pass over the ids)
+                existing = set(Post.objects.values_list("id", flat=True).iterator(chunk_size=self.batch_size))
+                for post_id in [pk for pk in self.idx.live if pk not in existing]:
+                    self.idx.remove(post_id)
+            else:
+                self.idx.build(Post.objects.all(), chunk_size=self.batch_size)
+            return True
+        finally:
+            self.idx.lock.release()
+
+    def preload(self):
+        try:
+            self.ensure_loaded()
+        except Exception:
+            logger.exception("Could not preload the search index; the first search will load it")
+        finally:
+            connections.close_all()
+
+    def install(self):
+        pass
+
+    def index(self, posts):
+        if self.idx.loaded:  # otherwise loading it picks these posts up
+            for post in posts:
+                self.idx.add(post.id, post.title, post.content)
+
+    def remove(self, post_ids):
+        for post_id in post_ids:
+            self.idx.remove(post_id)
+
+    def rebuild(self):
+        self.idx.build(Post.objects.all(), chunk_size=self.batch_size)
+        path = self.snapshot_path()
+        if path:
+            self.idx.save(path)
+        return len(self.idx.live)
+
+    def ranked_ids(self, query, limit):
+        if not self.ensure_loaded(blocking=False):
+            raise SearchUnavailable("search index is still loading")
+        return self.idx.search(query, limit)
+
+
+def preload():
+    """Start loading the index in the background when it is the configured backend."""
+    backend = get_search_backend()
+    if not isinstance(backend, InvertedIndexBackend):
+        return None
+    thread = threading.Thread(target=backend.preload, name="search-index-preload", daemon=True)
+    thread.start()
+    return thread
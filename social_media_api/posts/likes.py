@@ -0,0 +1,96 @@
+# posts/likes.py
+"""
+Like / unlike as single statements (used by LikePostView / UnlikePostView).
+
+- like():   INSERT ... ON CONFLICT DO NOTHING, unlike(): one DELETE; the
+  rowcount says whether anything changed, so repeats are harmless no-ops
+- Post.likes_count moves in the same transaction, only when a row did
+- The post is read as (author_id,) only: no Post or author instance
+- Statements go straight to the database, so the Like post_save/post_delete
+  receivers in posts/signals.py (which cover ORM writes) do not fire twice
+- liked_post_ids(): the "liked_by_me" lookup behind PostSerializer, one
+  query per page, memoized on the request
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from notifications.utils import create_notification
+from . import counters
+from .models import Post, Like
+
+
+class PostNotFound(Exception):
+    pass
+
+
+def _table():
+    qn = connection.ops.quote_name
+    return qn(Like._meta.db_table), qn(Like._meta.get_field("user").column), qn(Like._meta.get_field("post").column)
+
+
+def liked_post_ids(request, post_ids):
+    """
+    The subset of `post_ids` liked by the request's user. Answers are kept on
+    the request, so serializers asking again (per post, or for the same page
+    from another view) cost nothing.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return set()
+    memo = getattr(request, "_liked_post_ids", None)
+    if memo is None:
+        memo = request._liked_post_ids = {"checked": set(), "liked": set()}
+    post_ids = set(post_ids)
+    missing = post_ids - memo["checked"]
+    if missing:
+        # WHERE user_id = %s AND post_id IN (...): the (user, post) unique index
+        memo["liked"].update(
+            Like.objects.filter(user_id=user.pk, post_id__in=missing).values_list("post_id", flat=True)
+        )
+        memo["checked"] |= missing
+    return memo["liked"] & post_ids
+
+
+def like(user, post_id):
+    """Like `post_id` as `user`; True if a new like was recorded."""
+    author_id = Post.objects.filter(pk=post_id).values_list("author_id", flat=True).first()
+    if author_id is None:
+        raise PostNotFound(post_id)
+    table, user_col, post_col = _table()
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} ({user_col}, {post_col}, created_at) VALUES (%s, %s, %s) "
+                    f"ON CONFLICT ({user_col}, {post_col}) DO NOTHING",
+                    [user.pk, post_id, connection.ops.adapt_datetimefield_value(timezone.now())],
+                )
+                created = cursor.rowcount == 1
+            if created:
+                counters.bump(post_id, "likes_count", 1)
+                if author_id != user.pk:
+                    # Queued for after commit (notifications/dispatcher.py)
+                    create_notification(
+                        recipient=author_id,
+                        actor=user,
+                        verb="liked your post",
+                        target=Post(pk=post_id, author_id=author_id),
+                    )
+    except IntegrityError:  # the post was deleted in between
+        raise PostNotFound(post_id)
+    return created
+
+
+def unlike(user, post_id):
+    """Remove `user`'s like of `post_id`; True if there was one."""
+    table, user_col, post_col = _table()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {user_col} = %s AND {post_col} = %s",
+                [user.pk, post_id],
+            )
+            deleted = cursor.rowcount == 1
+        if deleted:
+            counters.bump(post_id, "likes_count", -1)
+    return deleted
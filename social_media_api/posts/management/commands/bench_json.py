@@ -0,0 +1,68 @@
+import io
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from posts.models import Post
+from posts.serializers import PostSerializer
+from social_media_api.fastjson import FastJSONParser, FastJSONRenderer, orjson
+
+
+def sample_page(size):
+    """Serialized PostSerializer page built from unsaved objects (no database needed)."""
+    User = get_user_model()
+    now = timezone.now()
+    authors = [User(id=i, username=f"author{i}") for i in range(1, 6)]
+    posts = [
+        Post(
+            id=i,
+            author=authors[i % len(authors)],
+            title=f"Benchmark post {i}",
+            content="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8 + "ünïcode 🎉",
+            created_at=now,
+            updated_at=now,
+            comments_count=i,
+        )
+        for i in range(1, size + 1)
+    ]
+    return {"count": size, "next": None, "previous": None, "results": PostSerializer(posts, many=True).data}
+
+
+class Command(BaseCommand):
+    help = "Compare FastJSONRenderer/FastJSONParser with DRF's defaults on PostSerializer pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100], help="Page sizes.")
+        parser.add_argument("--number", type=int, default=2000, help="Calls per measurement.")
+
+    def handle(self, *args, **options):
+        number = options["number"]
+        self.stdout.write(f"orjson: {orjson.__version__ if orjson else 'not installed (stdlib fallback)'}")
+        self.stdout.write(f"{'items':>6} {'op':<7} {'drf µs':>9} {'fast µs':>9} {'speedup':>8}")
+        for size in options["sizes"]:
+            data = sample_page(size)
+            body = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != body:
+                self.stderr.write(self.style.ERROR(f"Output differs for {size} items"))
+
+            pairs = {
+                "render": (
+                    lambda: JSONRenderer().render(data),
+                    lambda: FastJSONRenderer().render(data),
+                ),
+                "parse": (
+                    lambda: JSONParser().parse(io.BytesIO(body)),
+                    lambda: FastJSONParser().parse(io.BytesIO(body)),
+                ),
+            }
+            for op, (default, fast) in pairs.items():
+                drf_us = min(timeit.repeat(default, number=number, repeat=3)) / number * 1e6
+                fast_us = min(timeit.repeat(fast, number=number, repeat=3)) / number * 1e6
+                self.stdout.write(
+                    f"{size:>6} {op:<7} {drf_us:>9.1f} {fast_us:>9.1f} {drf_us / fast_us:>7.1f}x"
+                )
+
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = "Stream one user's posts, comments and likes as NDJSON or CSV (stdout or --output file)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--format", choices=sorted(export.FORMATS), default="ndjson")
+        parser.add_argument(
+            "--include", default=",".join(export.KINDS),
+            help="Comma-separated subset of: posts,comments,likes.",
+        )
+        parser.add_argument("--output", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["username"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+        kinds = [k for k in options["include"].split(",") if k]
+        if not kinds or set(kinds) - set(export.KINDS):
+            raise CommandError(f"--include takes a subset of: {','.join(export.KINDS)}.")
+
+        chunks = export.stream(user, options["format"], kinds)
+        if options["output"]:
+            with open(options["output"], "wb") as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+            self.stderr.write(f"Wrote {options['output']}.")
+        else:
+            # Raw bytes when stdout is a real stream; text for captured output (tests)
+            raw = getattr(self.stdout._out, "buffer", None)
+            for chunk in chunks:
+                if raw is not None:
+                    raw.write(chunk)
+                else:
+                    self.stdout.write(chunk.decode(), ending="")
+            if raw is not None:
+                raw.flush()
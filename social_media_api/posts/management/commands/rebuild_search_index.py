@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Create the post search index for the configured backend and (re)fill it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--install-only", action="store_true",
+            help="Only create the index structures; keep existing entries.",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            raise CommandError("No search backend for this database; ?search= uses icontains.")
+        backend.install()
+        if options["install_only"]:
+            self.stdout.write(self.style.SUCCESS(f"Installed {type(backend).__name__}."))
+            return
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} post(s) with {type(backend).__name__}."))
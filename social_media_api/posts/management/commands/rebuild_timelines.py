@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized home timelines (all users, or the given user ids)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("user_ids", nargs="*", type=int, help="Only rebuild these users.")
+        parser.add_argument(
+            "--trim-only", action="store_true",
+            help="Just trim existing timelines to TIMELINE_MAX_LENGTH (run it periodically).",
+        )
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options["user_ids"]:
+            users = users.filter(id__in=options["user_ids"])
+
+        count = 0
+        if options["trim_only"]:
+            ids = list(users.values_list("id", flat=True))
+            timeline.trim(ids)  # only over-limit timelines are touched
+            count = len(ids)
+        else:
+            for user in users.iterator(chunk_size=timeline.BATCH_SIZE):
+                timeline.rebuild(user)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} timeline(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = "Repair drift in Post.comments_count / Post.likes_count from the Comment and Like tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=counters.BATCH_SIZE, help="Posts checked per batch.")
+        parser.add_argument("--dry-run", action="store_true", help="Report drift without fixing it.")
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile(batch_size=options["batch_size"], dry_run=options["dry_run"])
+        verb = "Found" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {fixed} post(s) with drifted counters."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import ranking
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the precomputed scores behind the top feed (?mode=top). Only posts whose "
+        "likes/comments changed since the last run are rescored; schedule it, e.g. every minute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Rescore every post (first run, or after changing POSTS_TOP_* settings).",
+        )
+        parser.add_argument("--batch-size", type=int, default=ranking.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = ranking.refresh(full=options["full"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Scored {count} post(s)."))
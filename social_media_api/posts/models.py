@@ -16,11 +16,21 @@ class Post(models.Model):
     created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, maintained by posts/counters.py
+    # (fill / repair them with `manage.py reconcile_post_counters`)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    # Changes with anything a client can see (edits, counters, embedded
+    # comments); drives ETag / Last-Modified, see posts/conditional.py
+    last_modified = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
             models.Index(fields=['author', '-created_at']),
+            # Incremental score refresh (posts/ranking.py)
+            models.Index(fields=['last_modified']),
         ]
 
     def __str__(self):
@@ -59,4 +69,55 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ("user", "post")
\ No newline at end of file
+        unique_together = ("user", "post")
+
+#....................... Timeline model..........
+class TimelineEntry(models.Model):
+    """
+    Materialized home-timeline row: `owner` sees `post` in their feed.
+    Filled by fan-out-on-write (see posts/timeline.py); `author` and
+    `created_at` are copied from the post so the feed is one range scan.
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+"
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ("owner", "post")
+        indexes = [
+            # Feed pages and trimming: ORDER BY created_at DESC, post_id DESC
+            models.Index(fields=['owner', '-created_at', '-post']),
+            models.Index(fields=['owner', 'author']),
+        ]
+
+    def __str__(self):
+        return f'Post {self.post_id} in timeline of {self.owner_id}'
+
+
+#....................... Ranking model..........
+class PostScore(models.Model):
+    """
+    Precomputed time-decayed engagement score of a post, for the "top" feed
+    (see posts/ranking.py). `source_modified` is the post's last_modified
+    the last refresh computed it from (null until a refresh has seen it).
+    """
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, primary_key=True, related_name="score"
+    )
+    score = models.FloatField()
+    source_modified = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score']),
+            models.Index(fields=['source_modified']),
+        ]
+
+    def __str__(self):
+        return f'Post {self.post_id}: {self.score:.3f}'
@@ -1,6 +1,194 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple("Cursor", ["position", "id", "reverse"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination on (created_at, id).
+
+    - Views can key on another timestamp with `keyset_field = "..."`, and
+      break ties on another id column with `keyset_tiebreak = "..."` (both
+      may be annotations; list views over rows must select them)
+    - The key is the queryset's leading ordering column, which must be one
+      of the view's `keyset_fields` (default: just keyset_field), so
+      ?ordering=-updated_at pages in updated_at order. Any other ordering
+      (a search rank, a score) cannot be sought on: see seek_field()
+    - Direction follows the queryset ordering (-created_at → newest first)
+    - ?cursor=<opaque> continues after/before the row it encodes
+    - Never runs COUNT(*) and never uses OFFSET, so page 1000 costs the same as page 1
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+    field = "created_at"
+    tiebreak = "id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field = self.seek_field(queryset, view) or getattr(view, "keyset_field", self.field)
+        self.tiebreak = getattr(view, "keyset_tiebreak", self.tiebreak)
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        # Walking backwards flips the scan direction; the page is re-reversed below
+        reverse = bool(self.cursor and self.cursor.reverse)
+        descending = self.is_descending(queryset) != reverse
+        field, tiebreak = self.field, self.tiebreak
+        if descending:
+            queryset = queryset.order_by(f"-{field}", f"-{tiebreak}")
+        else:
+            queryset = queryset.order_by(field, tiebreak)
+
+        if self.cursor:
+            op = "lt" if descending else "gt"
+            bound = "lte" if descending else "gte"
+            value = self.cursor.position
+            queryset = queryset.filter(
+                **{f"{field}__{bound}": value}
+            ).filter(
+                Q(**{f"{field}__{op}": value})
+                | Q(**{field: value, f"{tiebreak}__{op}": self.cursor.id})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    @staticmethod
+    def leading_ordering(queryset):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering or ["-created_at"]
+        return ordering[0]
+
+    @classmethod
+    def is_descending(cls, queryset):
+        return str(cls.leading_ordering(queryset)).startswith("-")
+
+    @classmethod
+    def seek_field(cls, queryset, view=None):
+        """The column this queryset's ordering can be sought on, or None."""
+        first = cls.leading_ordering(queryset)
+        if not isinstance(first, str):  # an expression, e.g. a score
+            return None
+        default = getattr(view, "keyset_field", cls.field)
+        name = first.lstrip("-")
+        return name if name in getattr(view, "keyset_fields", (default,)) else None
+
+    # ----- cursors -----
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = urlsafe_b64decode(encoded.encode("ascii")).decode("ascii")
+            position, pk, reverse = raw.split("|")
+            position = parse_datetime(position)
+            if position is None:
+                raise ValueError
+            return Cursor(position, int(pk), reverse == "1")
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        raw = f"{getattr(obj, self.field).isoformat()}|{getattr(obj, self.tiebreak)}|{int(reverse)}"
+        encoded = urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
 
 class DefaultPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; switches to KeysetPagination when
+    - the request asks for it: ?pagination=cursor (or passes ?cursor=...)
+    - the view opts in:        pagination_mode = "cursor"
+    ?pagination=page forces page numbers back on such views. Views ordered by
+    something the keyset cannot seek on set `keyset_allowed = False`; a
+    request ordered that way (e.g. ?search= by relevance) gets page numbers
+    too, so the order it asked for is kept.
+    """
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+    mode_query_param = "pagination"
+    keyset = None
+
+    def use_keyset(self, request, view=None):
+        if not getattr(view, "keyset_allowed", True):
+            return False
+        mode = request.query_params.get(self.mode_query_param)
+        if mode is None:
+            if KeysetPagination.cursor_query_param in request.query_params:
+                return True
+            mode = getattr(view, "pagination_mode", "page")
+        return mode == "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request, view) and KeysetPagination.seek_field(queryset, view):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
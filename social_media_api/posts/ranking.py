@@ -0,0 +1,106 @@
+# posts/ranking.py
+"""
+Precomputed ranking for the "top" home feed (FeedView ?mode=top).
+
+- score = log2(1 + likes + POSTS_TOP_COMMENT_WEIGHT * comments)
+          + created_at / POSTS_TOP_HALF_LIFE
+  i.e. engagement that halves every half-life (12 h). The decay term only
+  depends on created_at, so the order by score is the order by decayed
+  engagement at any moment: scores never need refreshing just because time
+  passed, only when a post's likes or comments change
+- Stored in PostScore; the feed orders by that one joined column, with no
+  aggregates at request time. Inputs are the denormalized counters on Post
+- New posts get their score when created; `manage.py refresh_post_scores`
+  (run it every minute or so) rescores the posts whose last_modified moved
+  since the newest score it stored: new or removed likes and comments
+- Changing the settings needs `refresh_post_scores --full`
+"""
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Max
+
+from .models import Post, PostScore
+
+BATCH_SIZE = 1000
+
+
+def half_life():
+    return getattr(settings, "POSTS_TOP_HALF_LIFE", 12 * 3600)
+
+
+def comment_weight():
+    return getattr(settings, "POSTS_TOP_COMMENT_WEIGHT", 2)
+
+
+def refresh_overlap():
+    # Rows committed late (a transaction that started before the last run)
+    # carry an older last_modified; rescan a little of the past to catch them
+    return timedelta(seconds=getattr(settings, "POSTS_TOP_REFRESH_OVERLAP", 60))
+
+
+def compute(likes, comments, created_at):
+    engagement = 1 + likes + comment_weight() * comments
+    return math.log2(engagement) + created_at.timestamp() / half_life()
+
+
+def score_of(post):
+    return PostScore(
+        post_id=post.pk,
+        score=compute(post.likes_count, post.comments_count, post.created_at),
+        source_modified=post.last_modified,
+    )
+
+
+def initial_score(post):
+    """
+    Score of a post being created. Left without source_modified so it does not
+    move the refresh watermark past changes the refresh has not seen yet.
+    """
+    score = score_of(post)
+    score.source_modified = None
+    return score
+
+
+def save_scores(scores):
+    PostScore.objects.bulk_create(
+        scores,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=["score", "source_modified"],
+    )
+
+
+def refresh(full=False, batch_size=BATCH_SIZE):
+    """
+    Rescore the posts modified since the newest stored score (minus the
+    overlap), or every post with `full` / when nothing is stored yet.
+    Returns the number of posts scored.
+    """
+    since = None
+    if not full:
+        latest = PostScore.objects.aggregate(latest=Max("source_modified"))["latest"]
+        since = latest - refresh_overlap() if latest else None
+    posts = Post.objects.order_by().only(
+        "id", "likes_count", "comments_count", "created_at", "last_modified"
+    )
+    if since is not None:
+        posts = posts.filter(last_modified__gte=since)
+
+    count, batch = 0, []
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.append(score_of(post))
+        if len(batch) >= batch_size:
+            save_scores(batch)
+            count, batch = count + len(batch), []
+    if batch:
+        save_scores(batch)
+        count += len(batch)
+    return count
+
+
+def rank(queryset):
+    """Order a Post queryset by score; posts not scored yet go last."""
+    return queryset.order_by(F("score__score").desc(nulls_last=True), "-created_at", "-id")
@@ -0,0 +1,197 @@
+# posts/response_cache.py
+"""
+Version-keyed response cache for anonymous post reads (PostViewSet list/retrieve).
+
+- Nothing is deleted on writes: posts/signals.py bumps per-post, per-author and
+  list version counters, and every cache key embeds the versions it was built
+  from, so stale entries are simply never read again and age out by TTL
+- Detail: one entry per (post version, author version)
+- List: a page skeleton (envelope + post/author ids) per query string and list
+  version, plus one fragment per post shared by every page it appears on; a
+  like only invalidates that post's fragment, not the pages listing it
+- A hit costs a few cache round trips and no database query; ETag and
+  Last-Modified come from the same versions
+- Settings: POSTS_CACHE_ALIAS ("default"), POSTS_CACHE_TIMEOUT (600 s),
+  POSTS_CACHE_ENABLED (True)
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .conditional import make_etag, precondition_response, set_validators
+
+LIST_VERSION_KEY = "posts:v:list"
+
+
+def post_version_key(post_id):
+    return f"posts:v:post:{post_id}"
+
+
+def author_version_key(author_id):
+    return f"posts:v:author:{author_id}"
+
+
+def get_cache():
+    return caches[getattr(settings, "POSTS_CACHE_ALIAS", "default")]
+
+
+def cache_timeout():
+    return getattr(settings, "POSTS_CACHE_TIMEOUT", 600)
+
+
+def _fresh_version():
+    # Start from the clock so an evicted counter never comes back with a value
+    # that old entries were stored under
+    return time.time_ns()
+
+
+def versions(keys):
+    """Current value of each version key, creating missing ones."""
+    cache = get_cache()
+    found = cache.get_many(keys)
+    missing = {key: _fresh_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return found
+
+
+def bump(*keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def invalidate(*keys):
+    """
+    Bump now and again after commit: a reader that re-caches the old rows
+    between the two (the write is not visible yet) is overruled by the second.
+    """
+    bump(*keys)
+    transaction.on_commit(lambda: bump(*keys))
+
+
+def invalidate_post(post_id, listing=False):
+    keys = [post_version_key(post_id)]
+    if listing:  # membership / ordering / search matches may have changed
+        keys.append(LIST_VERSION_KEY)
+    invalidate(*keys)
+
+
+def invalidate_author(author_id):
+    invalidate(author_version_key(author_id))
+
+
+class CachedReadMixin:
+    """Serve anonymous list()/retrieve() from the version-keyed cache."""
+
+    def use_response_cache(self, request):
+        return (
+            getattr(settings, "POSTS_CACHE_ENABLED", True)
+            and request.method in ("GET", "HEAD")
+            and not request.user.is_authenticated
+        )
+
+    def cache_prefix(self, request):
+        # Links in the payload are absolute and the format decides the renderer
+        base = f"{request.accepted_renderer.format}|{request.build_absolute_uri('/')}"
+        return hashlib.md5(base.encode("utf-8"), usedforsecurity=False).hexdigest()[:12]
+
+    @staticmethod
+    def cached_response(request, etag, last_modified, data):
+        early = precondition_response(request, etag, last_modified)
+        if early is not None:
+            return early
+        return set_validators(Response(data), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if not self.use_response_cache(request) or not str(lookup).isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        post_id = int(lookup)
+        cache = get_cache()
+        post_v = versions([post_version_key(post_id)])[post_version_key(post_id)]
+        entry_key = f"posts:detail:{self.cache_prefix(request)}:{post_id}:{post_v}"
+
+        entry = cache.get(entry_key)
+        if entry is not None:
+            author_key = author_version_key(entry["author_id"])
+            if versions([author_key])[author_key] != entry["author_v"]:
+                entry = None
+        if entry is None:
+            post = self.get_object()
+            author_key = author_version_key(post.author_id)
+            entry = {
+                "author_id": post.author_id,
+                "author_v": versions([author_key])[author_key],
+                "last_modified": post.last_modified,
+                "data": self.get_serializer(post).data,
+            }
+            cache.set(entry_key, entry, cache_timeout())
+
+        etag = make_etag(request, "detail", post_id, post_v, entry["author_v"])
+        return self.cached_response(request, etag, entry["last_modified"], entry["data"])
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return super().list(request, *args, **kwargs)
+        cache = get_cache()
+        prefix = self.cache_prefix(request)
+        list_v = versions([LIST_VERSION_KEY])[LIST_VERSION_KEY]
+        path_hash = hashlib.md5(request.get_full_path().encode("utf-8"), usedforsecurity=False).hexdigest()
+        page_key = f"posts:page:{prefix}:{list_v}:{path_hash}"
+
+        loaded = {}
+        skeleton = cache.get(page_key)
+        if skeleton is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            posts = list(page if page is not None else queryset)
+            loaded = {post.pk: post for post in posts}
+            envelope = None
+            if page is not None:
+                envelope = dict(self.get_paginated_response([]).data)
+                envelope.pop("results")
+            skeleton = {"envelope": envelope, "rows": [(post.pk, post.author_id) for post in posts]}
+            cache.set(page_key, skeleton, cache_timeout())
+
+        rows = skeleton["rows"]
+        current = versions(
+            [post_version_key(pid) for pid, _ in rows]
+            + list({author_version_key(aid) for _, aid in rows})
+        )
+        fragment_keys = {
+            pid: f"posts:row:{prefix}:{pid}:{current[post_version_key(pid)]}:{current[author_version_key(aid)]}"
+            for pid, aid in rows
+        }
+        fragments = cache.get_many(list(fragment_keys.values()))
+
+        missing = [pid for pid, _ in rows if fragment_keys[pid] not in fragments]
+        if missing:
+            need = [pid for pid in missing if pid not in loaded]
+            if need:
+                loaded.update(self.get_queryset().in_bulk(need))
+            built = {}
+            for pid in missing:
+                post = loaded.get(pid)
+                if post is not None:  # deleted since the page was cached
+                    built[fragment_keys[pid]] = {
+                        "last_modified": post.last_modified,
+                        "data": self.get_serializer(post).data,
+                    }
+            cache.set_many(built, cache_timeout())
+            fragments.update(built)
+
+        hits = [fragments[fragment_keys[pid]] for pid, _ in rows if fragment_keys[pid] in fragments]
+        results = [fragment["data"] for fragment in hits]
+        data = results if skeleton["envelope"] is None else {**skeleton["envelope"], "results": results}
+        last_modified = max((fragment["last_modified"] for fragment in hits), default=None)
+        etag = make_etag(request, path_hash, list_v, *(fragment_keys[pid] for pid, _ in rows))
+        return self.cached_response(request, etag, last_modified, data)
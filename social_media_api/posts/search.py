@@ -0,0 +1,265 @@
+# posts/search.py
+"""
+Pluggable full-text search for posts (?search= on PostViewSet).
+
+- PostgresSearchBackend: weighted tsvector side table + GIN index, ts_rank
+- SQLiteFTS5Backend:     FTS5 virtual table, bm25 ranking (local/tests)
+- Both match and rank inside the posts query (SQLSearchBackend): an id IN
+  (SELECT ... FROM <index> WHERE <match>) filter plus a per-row rank looked up
+  by post id, so every match can be paged through and `count` is exact
+- Backends without SQL (posts/inverted_index.py) hand over their best
+  POSTS_SEARCH_MAX_RESULTS (500) ids instead
+- Backends keep their index current per post (posts/signals.py) and are
+  created/filled with `manage.py rebuild_search_index`
+- Usernames are not in the index: a query that is exactly a username (an
+  optional leading "@" allowed) also matches that author's posts, ranked
+  after the text matches. One lookup on the unique username index, and
+  nothing to reindex when a user is renamed
+- POSTS_SEARCH_BACKEND = "auto" (by DB vendor), a dotted path, or None;
+  when no backend is usable the filter falls back to icontains
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchUnavailable(Exception):
+    """The backend cannot answer (not installed, wrong database, ...): fall back."""
+
+
+class BaseSearchBackend:
+    vendor = None
+    batch_size = 1000
+
+    def max_results(self):
+        return getattr(settings, "POSTS_SEARCH_MAX_RESULTS", 500)
+
+    # ----- schema -----
+    def install(self):
+        raise NotImplementedError
+
+    # ----- index maintenance -----
+    def index(self, posts):
+        raise NotImplementedError
+
+    def remove(self, post_ids):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Re-index every post in batches; returns the number indexed."""
+        total = 0
+        batch = []
+        for post in Post.objects.only("id", "title", "content").iterator(chunk_size=self.batch_size):
+            batch.append(post)
+            if len(batch) >= self.batch_size:
+                total += self.safe_index(batch)
+                batch = []
+        if batch:
+            total += self.safe_index(batch)
+        return total
+
+    def safe_index(self, posts):
+        """index() that never breaks the write path (savepoint + one warning per process)."""
+        try:
+            with transaction.atomic():
+                self.index(posts)
+        except DatabaseError:
+            self.warn_once()
+            return 0
+        return len(posts)
+
+    def safe_remove(self, post_ids):
+        try:
+            with transaction.atomic():
+                self.remove(post_ids)
+        except DatabaseError:
+            self.warn_once()
+
+    def warn_once(self):
+        cls = type(self)
+        if not getattr(cls, "_warned", False):
+            cls._warned = True
+            logger.warning("%s index is not installed; run rebuild_search_index", cls.__name__)
+
+    # ----- querying -----
+    def ranked_ids(self, query, limit):
+        """Post ids matching `query`, best first."""
+        raise NotImplementedError
+
+    @staticmethod
+    def author_match(query):
+        return Q(author_id__in=get_user_model().objects.filter(username=query.lstrip("@")).values("id"))
+
+    def search(self, queryset, query):
+        """
+        Restrict `queryset` to the best max_results() matches, annotated with
+        `search_rank` (1 = best).
+        """
+        ids = []
+        if WORD_RE.search(query):
+            try:
+                with transaction.atomic():
+                    ids = self.ranked_ids(query, self.max_results())
+            except DatabaseError as exc:
+                raise SearchUnavailable(str(exc)) from exc
+        by_author = self.author_match(query)
+        if not ids:
+            return queryset.filter(by_author).annotate(search_rank=Value(1, output_field=IntegerField()))
+        rank = Case(
+            *[When(id=pk, then=Value(pos)) for pos, pk in enumerate(ids, start=1)],
+            default=Value(len(ids) + 1),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(Q(id__in=ids) | by_author).annotate(search_rank=rank)
+
+
+class SQLSearchBackend(BaseSearchBackend):
+    """Backends whose index is a table in the posts database: no result cap."""
+
+    def match_sql(self, query):
+        """(sql, params) selecting the ids of the posts matching `query`."""
+        raise NotImplementedError
+
+    def rank_sql(self, query, post_id):
+        """(sql, params) ranking the post whose id is the column `post_id`; lower is better."""
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        """Restrict `queryset` to every match, annotated with `search_rank` (lower = better)."""
+        if not WORD_RE.search(query):
+            return queryset.filter(self.author_match(query)).annotate(
+                search_rank=Value(None, output_field=FloatField())
+            )
+        match_sql, match_params = self.match_sql(query)
+        try:
+            # A missing index fails here, not halfway through the page query
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"{match_sql} LIMIT 1", match_params)
+        except DatabaseError as exc:
+            raise SearchUnavailable(str(exc)) from exc
+        qn = connection.ops.quote_name
+        rank_sql, rank_params = self.rank_sql(query, f"{qn(Post._meta.db_table)}.{qn('id')}")
+        return queryset.filter(
+            Q(id__in=RawSQL(match_sql, match_params)) | self.author_match(query)
+        ).annotate(search_rank=RawSQL(rank_sql, rank_params, output_field=FloatField()))
+
+
+class SQLiteFTS5Backend(SQLSearchBackend):
+    vendor = "sqlite"
+    table = "posts_post_fts"
+    title_weight, content_weight = 10.0, 1.0
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                f"USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def index(self, posts):
+        rows = [(p.id, p.title, p.content) for p in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(r[0],) for r in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(pk,) for pk in post_ids])
+
+    @staticmethod
+    def to_match(query):
+        # Quote every word so user input can never be FTS5 syntax; words are ANDed
+        return " ".join(f'"{w}"' for w in WORD_RE.findall(query))
+
+    def match_sql(self, query):
+        return f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [self.to_match(query)]
+
+    def rank_sql(self, query, post_id):
+        # MATCH + rowid: one FTS5 lookup by rowid, with bm25 available
+        return (
+            f"SELECT bm25({self.table}, %s, %s) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = {post_id}",
+            [self.title_weight, self.content_weight, self.to_match(query)],
+        )
+
+
+class PostgresSearchBackend(SQLSearchBackend):
+    vendor = "postgresql"
+    table = "posts_post_search"
+    config = "english"
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                f" post_id bigint PRIMARY KEY REFERENCES posts_post(id) ON DELETE CASCADE,"
+                f" document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_document_gin "
+                f"ON {self.table} USING gin (document)"
+            )
+
+    def index(self, posts):
+        document = (
+            "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, %s), 'B')"
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {self.table} (post_id, document) VALUES (%s, {document}) "
+                f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document",
+                [(p.id, self.config, p.title, self.config, p.content) for p in posts],
+            )
+
+    def remove(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE post_id = ANY(%s)", [list(post_ids)])
+
+    def match_sql(self, query):
+        return (
+            f"SELECT post_id FROM {self.table} WHERE document @@ websearch_to_tsquery(%s::regconfig, %s)",
+            [self.config, query],
+        )
+
+    def rank_sql(self, query, post_id):
+        # Primary-key lookup in the side table; negated so lower is better
+        return (
+            f"SELECT -ts_rank(s.document, websearch_to_tsquery(%s::regconfig, %s)) "
+            f"FROM {self.table} s WHERE s.post_id = {post_id}",
+            [self.config, query],
+        )
+
+
+BACKENDS_BY_VENDOR = {
+    "sqlite": SQLiteFTS5Backend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """The configured backend instance, or None (icontains fallback)."""
+    path = getattr(settings, "POSTS_SEARCH_BACKEND", "auto")
+    if not path:
+        return None
+    if path == "auto":
+        backend_class = BACKENDS_BY_VENDOR.get(connection.vendor)
+        return backend_class() if backend_class else None
+    backend = import_string(path)()
+    if backend.vendor and backend.vendor != connection.vendor:
+        return None
+    return backend
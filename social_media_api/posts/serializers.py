@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from .likes import liked_post_ids
 from .models import Post, Comment
 
 User = get_user_model()
@@ -22,9 +24,21 @@ class UserBriefSerializer(serializers.ModelSerializer):
             return None
 
 
+class PostListSerializer(serializers.ListSerializer):
+    """Looks up liked_by_me for the whole page before rendering its posts."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, "all") else data)
+        liked_post_ids(self.context.get("request"), [post.pk for post in posts])
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = UserBriefSerializer(read_only=True)
-    comments_count = serializers.IntegerField(source="comments.count", read_only=True)
+    # Denormalized columns on Post, no per-row COUNT
+    comments_count = serializers.IntegerField(read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -36,8 +50,11 @@ class PostSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "comments_count",
+            "likes_count",
+            "liked_by_me",
         )
-        read_only_fields = ("id", "author", "created_at", "updated_at", "comments_count")
+        read_only_fields = ("id", "author", "created_at", "updated_at", "comments_count", "likes_count")
+        list_serializer_class = PostListSerializer
 
     # Attach the authenticated user as author
     def create(self, validated_data):
@@ -47,6 +64,10 @@ class PostSerializer(serializers.ModelSerializer):
         validated_data["author"] = request.user
         return super().create(validated_data)
 
+    def get_liked_by_me(self, obj):
+        # Memoized per request; a list page was looked up in one query
+        return obj.pk in liked_post_ids(self.context.get("request"), [obj.pk])
+
     # Light validation / normalization
     def validate_title(self, value: str):
         v = value.strip()
@@ -61,10 +82,32 @@ class PostSerializer(serializers.ModelSerializer):
         return v
 
 
+class PrefetchedPostField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves from context["posts_by_id"] when the
+    caller loaded the posts up front (one in_bulk() for a whole bulk import).
+    """
+
+    def to_internal_value(self, data):
+        posts = self.context.get("posts_by_id")
+        if posts is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        post = posts.get(pk)
+        if post is None:
+            self.fail("does_not_exist", pk_value=data)
+        return post
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = UserBriefSerializer(read_only=True)
     # For writes: accept post as PK. For reads: expose post_id.
-    post = serializers.PrimaryKeyRelatedField(
+    post = PrefetchedPostField(
         queryset=Post.objects.all(), write_only=True, required=False
     )
     post_id = serializers.IntegerField(source="post.id", read_only=True)
@@ -111,8 +154,24 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 class PostDetailSerializer(PostSerializer):
-    """Post with embedded comments for detail endpoints."""
-    comments = CommentSerializer(many=True, read_only=True)
+    """
+    Post with its latest comments embedded (oldest→newest) for detail endpoints.
+    The full thread is paginated at `comments_url`.
+    """
+    comments_limit = 20
+
+    comments = serializers.SerializerMethodField()
+    comments_url = serializers.SerializerMethodField()
 
     class Meta(PostSerializer.Meta):
-        fields = PostSerializer.Meta.fields + ("comments",)
+        fields = PostSerializer.Meta.fields + ("comments", "comments_url")
+
+    def get_comments(self, obj):
+        latest = getattr(obj, "latest_comments", None)
+        if latest is None:
+            # Not prefetched by the view: fetch the same bounded slice
+            latest = obj.comments.select_related("author").order_by("-created_at", "-id")[:self.comments_limit]
+        return CommentSerializer(reversed(list(latest)), many=True, context=self.context).data
+
+    def get_comments_url(self, obj):
+        return reverse("post-comments", args=[obj.pk], request=self.context.get("request"))
@@ -0,0 +1,107 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.signals import user_followed, user_unfollowed
+from . import counters, ranking, response_cache, timeline
+from .models import Post, Comment, Like
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: timeline.fan_out_post(instance))
+
+
+@receiver(post_save, sender=Post)
+def score_new_post(sender, instance, created, **kwargs):
+    # Ranked feeds can show it before the next refresh_post_scores run
+    if created:
+        ranking.save_scores([ranking.initial_score(instance)])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_cached_post(sender, instance, **kwargs):
+    response_cache.invalidate_post(instance.pk, listing=True)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_author(sender, instance, created, **kwargs):
+    # Username / avatar are embedded in every post by this author
+    if not created:
+        response_cache.invalidate_author(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        transaction.on_commit(lambda: backend.safe_index([instance]))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_for_search(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        transaction.on_commit(lambda: backend.safe_remove([instance.pk]))
+
+
+@receiver(pre_delete, sender=Post)
+def mark_cascade(sender, instance, origin=None, **kwargs):
+    # Its comments and likes are deleted next; their counters go with the row
+    counters.mark_deleting(instance.pk, origin)
+
+
+@receiver(post_delete, sender=Post)
+def unmark_cascade(sender, instance, **kwargs):
+    counters.unmark_deleting(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.post_id, "comments_count", 1)
+    else:
+        # Edited comments show up in the post detail, so its validators move too
+        Post.objects.filter(pk=instance.post_id).update(last_modified=timezone.now())
+        response_cache.invalidate_post(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, origin=None, **kwargs):
+    if not counters.is_deleting(instance.post_id, origin):
+        counters.bump(instance.post_id, "comments_count", -1)
+
+
+@receiver(post_save, sender=Like)
+def count_new_like(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(instance.post_id, "likes_count", 1)
+
+
+@receiver(post_delete, sender=Like)
+def count_deleted_like(sender, instance, origin=None, **kwargs):
+    if not counters.is_deleting(instance.post_id, origin):
+        counters.bump(instance.post_id, "likes_count", -1)
+
+
+@receiver(user_followed)
+def backfill_timeline_on_follow(sender, follower_id, user_ids, **kwargs):
+    timeline.backfill_authors(follower_id, user_ids)
+
+
+@receiver(user_unfollowed)
+def trim_timeline_on_unfollow(sender, follower_id, user_ids, **kwargs):
+    timeline.remove_authors(follower_id, user_ids)
+
+
+@receiver(user_unfollowed)
+def fan_out_below_limit(sender, follower_id, user_ids, **kwargs):
+    # Authors back under the fan-out limit: their posts are no longer pulled on read
+    crossed = timeline.crossed_below_limit(user_ids)
+    if crossed:
+        transaction.on_commit(lambda: timeline.fan_out_recent(crossed))
@@ -1,3 +1,1016 @@
-from django.test import TestCase
+"""
+API tests for posts, comments, likes and the home feed.
 
-# Create your tests here.
+Run:
+    python manage.py test posts -v 2
+"""
+
+import csv
+import io
+import json
+import os
+import uuid
+import tempfile
+import threading
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from .models import Post, PostScore, Comment, Like, TimelineEntry
+from . import export, ranking, timeline
+from .inverted_index import InvertedIndex, InvertedIndexBackend, get_index, preload
+from .response_cache import get_cache
+from .search import SQLiteFTS5Backend
+from .views import PostViewSet
+from social_media_api.fastjson import FastJSONParser, FastJSONRenderer
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedTimelineTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.reader = User.objects.create_user(username="reader", password="pass1234")
+        cls.author = User.objects.create_user(username="author", password="pass1234")
+        cls.other = User.objects.create_user(username="other", password="pass1234")
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def create_post(self, author, title="Hello world"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, title=title, content="Body")
+
+    def feed_ids(self):
+        res = self.client.get(reverse("feed"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [p["id"] for p in res.data["results"]]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.reader.follow(self.author)
+        post = self.create_post(self.author)
+        self.create_post(self.other)
+
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.reader, post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        post = self.create_post(self.author)
+        self.reader.follow(self.author)
+        self.assertEqual(self.feed_ids(), [post.id])
+
+        self.reader.unfollow(self.author)
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_timeline_is_trimmed(self):
+        self.reader.follow(self.author)
+        posts = [self.create_post(self.author, title=f"Post {i}") for i in range(4)]
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 4)
+
+        call_command("rebuild_timelines", "--trim-only", stdout=StringIO())
+
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.reader).count(), 2)
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.author).count(), 0)
+        self.assertEqual(self.feed_ids(), [posts[3].id, posts[2].id])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=1)
+    def test_high_fanout_author_is_read_on_demand(self):
+        self.reader.follow(self.author)
+        post = self.create_post(self.author)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=2)
+    def test_author_back_under_limit_is_fanned_out(self):
+        self.reader.follow(self.author)
+        self.other.follow(self.author)
+        post = self.create_post(self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.unfollow(self.author)
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.reader, post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_feed_pages_on_timeline_entry_columns(self):
+        self.reader.follow(self.author)
+        posts = [self.create_post(self.author, title=f"Post {i}") for i in range(3)]
+        url = reverse("feed") + "?page_size=2"
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get(url).data
+            second = self.client.get(first["next"]).data
+        self.assertEqual(
+            [p["id"] for p in first["results"] + second["results"]],
+            [post.id for post in reversed(posts)],
+        )
+        feed_sql = [q["sql"] for q in ctx.captured_queries if "posts_timelineentry" in q["sql"]]
+        self.assertTrue(feed_sql)
+        for sql in feed_sql:
+            self.assertNotIn('ORDER BY "posts_post"."created_at"', sql)
+        self.assertIn('"posts_timelineentry"."created_at" <=', feed_sql[-1])
+
+    def test_rebuild_matches_follow_graph(self):
+        self.reader.follow(self.author)
+        post = self.create_post(self.author)
+        TimelineEntry.objects.all().delete()
+
+        timeline.rebuild(self.reader)
+        self.assertEqual(self.feed_ids(), [post.id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username="pager", password="pass1234")
+        now = timezone.now()
+        # two posts share a timestamp so the id tie-breaker is exercised
+        stamps = [now - timedelta(minutes=m) for m in (0, 1, 1, 2, 3)]
+        cls.posts = [
+            Post.objects.create(author=cls.user, title=f"Post {i}", content="Body", created_at=ts)
+            for i, ts in enumerate(stamps)
+        ]
+        cls.post = cls.posts[0]
+        for i in range(3):
+            cls.post.comments.create(author=cls.user, content=f"Comment {i}")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", res.data)
+            pages.append(res.data)
+            ids += [p["id"] for p in res.data["results"]]
+            url = res.data["next"]
+        return ids, pages
+
+    def test_cursor_walk_matches_ordering_without_count(self):
+        expected = list(
+            Post.objects.order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            ids, pages = self.walk(reverse("post-list") + "?pagination=cursor&page_size=2")
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+
+    def test_cursor_follows_requested_ordering(self):
+        Post.objects.filter(pk=self.posts[3].pk).update(title="updated title", updated_at=timezone.now())
+        url = reverse("post-list") + "?ordering=-updated_at&pagination=cursor&page_size=2"
+        ids, _ = self.walk(url)
+        self.assertEqual(
+            ids, list(Post.objects.order_by("-updated_at", "-id").values_list("id", flat=True))
+        )
+        self.assertEqual(ids[0], self.posts[3].id)
+
+    def test_ranked_search_keeps_page_numbers(self):
+        backend = SQLiteFTS5Backend()
+        backend.install()
+        backend.rebuild()
+        res = self.client.get(reverse("post-list") + "?search=post&pagination=cursor")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("count", res.data)  # relevance order kept, no cursor
+        self.assertEqual(res.data["count"], len(self.posts))
+
+    def test_previous_cursor_returns_previous_page(self):
+        first = self.client.get(reverse("post-list") + "?pagination=cursor&page_size=2").data
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).data
+        back = self.client.get(second["previous"]).data
+        self.assertEqual(
+            [p["id"] for p in back["results"]],
+            [p["id"] for p in first["results"]],
+        )
+
+    def test_comments_endpoint_walks_oldest_first(self):
+        url = reverse("post-comments", args=[self.post.id]) + "?pagination=cursor&page_size=2"
+        ids, _ = self.walk(url)
+        self.assertEqual(ids, list(self.post.comments.values_list("id", flat=True)))
+
+    def test_page_numbers_remain_default(self):
+        res = self.client.get(reverse("post-list"))
+        self.assertEqual(res.data["count"], len(self.posts))
+
+    def test_invalid_cursor_is_404(self):
+        res = self.client.get(reverse("post-list") + "?cursor=not-a-cursor")
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostCounterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create_user(username="writer", password="pass1234")
+        cls.fan = User.objects.create_user(username="fan", password="pass1234")
+        cls.post = Post.objects.create(author=cls.author, title="Counted", content="Body")
+
+    def setUp(self):
+        self.client.force_authenticate(self.fan)
+
+    def counts(self):
+        self.post.refresh_from_db()
+        return self.post.comments_count, self.post.likes_count
+
+    def test_comment_create_and_delete_maintain_count(self):
+        res = self.client.post(
+            reverse("comment-list"), {"post": self.post.id, "content": "Nice"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.counts(), (1, 0))
+
+        res = self.client.delete(reverse("comment-detail", args=[res.data["id"]]))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_like_and_unlike_maintain_count(self):
+        self.client.post(reverse("like-post", args=[self.post.id]))
+        self.client.post(reverse("like-post", args=[self.post.id]))  # already liked
+        self.assertEqual(self.counts(), (0, 1))
+
+        self.client.post(reverse("unlike-post", args=[self.post.id]))
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_like_and_unlike_are_single_statements(self):
+        def statements(url_name):
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(reverse(url_name, args=[self.post.id]))
+            sql = [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+            return res.status_code, sql
+
+        ContentType.objects.get_for_model(Post)  # cached per process, not per like
+        code, sql = statements("like-post")
+        self.assertEqual(code, status.HTTP_201_CREATED)
+        # author_id lookup, INSERT ... ON CONFLICT, counter UPDATE
+        self.assertEqual(len(sql), 3)
+        self.assertIn("ON CONFLICT", sql[1])
+        self.assertLess(timezone.now() - Like.objects.get().created_at, timedelta(minutes=1))
+        code, sql = statements("like-post")
+        self.assertEqual((code, len(sql)), (status.HTTP_200_OK, 2))
+        self.assertEqual(self.counts(), (0, 1))
+
+        code, sql = statements("unlike-post")
+        self.assertEqual((code, len(sql)), (status.HTTP_200_OK, 2))
+        code, _ = statements("unlike-post")
+        self.assertEqual(code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.counts(), (0, 0))
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_missing_post_is_404(self):
+        for url_name in ("like-post", "unlike-post"):
+            res = self.client.post(reverse(url_name, args=[999999]))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_reconcile_repairs_drift(self):
+        Comment.objects.create(post=self.post, author=self.fan, content="Hi")
+        Like.objects.create(post=self.post, user=self.fan)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=7, likes_count=0)
+
+        call_command("reconcile_post_counters", stdout=StringIO())
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_unlike_before_counters_floors_at_zero(self):
+        # A like recorded before likes_count existed: the counter is still 0
+        Like.objects.create(post=self.post, user=self.fan)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=0)
+
+        res = self.client.post(reverse("unlike-post", args=[self.post.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_deleting_a_post_skips_per_row_counter_updates(self):
+        other = get_user_model().objects.create(username="other_fan")
+        Comment.objects.bulk_create([Comment(post=self.post, author=self.fan, content=str(i)) for i in range(30)])
+        Like.objects.bulk_create([Like(post=self.post, user=user) for user in (self.fan, other)])
+        kept = Comment.objects.create(post=self.post, author=other, content="Kept?")
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.post.delete()
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.filter(pk=kept.pk).exists())
+        self.assertFalse(any(q["sql"].startswith('UPDATE "posts_post"') for q in ctx.captured_queries))
+        self.assertLess(len(ctx.captured_queries), 15)
+
+    def test_deleting_a_comment_still_counts_down(self):
+        comment = Comment.objects.create(post=self.post, author=self.fan, content="Hi")
+        Like.objects.create(post=self.post, user=self.fan)
+        comment.delete()
+        self.fan.delete()  # cascades to their like, from the user's side
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_list_query_count_is_constant(self):
+        for i in range(5):
+            Post.objects.create(author=self.fan, title=f"More {i}", content="Body")
+
+        def queries(page_size):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse("post-list") + f"?pagination=cursor&page_size={page_size}")
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries(2), queries(6))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostCommentLoadingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username="chatty", password="pass1234")
+        cls.post = Post.objects.create(author=cls.user, title="Busy post", content="Body")
+        now = timezone.now()
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.user, content=f"Comment {i}",
+                created_at=now + timedelta(seconds=i),
+            )
+            for i in range(25)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_does_not_touch_comments(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("post-list"))
+        self.assertEqual(res.data["results"][0]["comments_count"], 25)
+        self.assertNotIn("comments", res.data["results"][0])
+        self.assertFalse(any("posts_comment" in q["sql"] for q in ctx.captured_queries))
+
+    def test_retrieve_embeds_latest_comments_only(self):
+        res = self.client.get(reverse("post-detail", args=[self.post.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        limit = PostViewSet.detail_comments_limit
+        self.assertEqual(
+            [c["id"] for c in res.data["comments"]],
+            [c.id for c in self.comments[-limit:]],
+        )
+        self.assertTrue(
+            res.data["comments_url"].endswith(reverse("post-comments", args=[self.post.id]))
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create(username="searcher")
+        cls.in_title = Post.objects.create(author=cls.user, title="Django caching tips", content="Short body")
+        cls.in_body = Post.objects.create(
+            author=cls.user, title="Misc notes", content="Some words about caching in general",
+        )
+        cls.other = Post.objects.create(author=cls.user, title="Gardening", content="Tomatoes")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.backend = SQLiteFTS5Backend()
+        self.backend.install()
+        self.backend.rebuild()
+
+    def search_ids(self, q):
+        res = self.client.get(reverse("post-list"), {"search": q})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [p["id"] for p in res.data["results"]]
+
+    def test_ranked_full_text_search(self):
+        self.assertEqual(self.search_ids("caching"), [self.in_title.id, self.in_body.id])
+        self.assertEqual(self.search_ids("gardening tomatoes"), [self.other.id])
+        self.assertEqual(self.search_ids('"unbalanced AND ('), [])
+
+    @override_settings(POSTS_SEARCH_MAX_RESULTS=1)
+    def test_every_match_is_paged_and_ranked_in_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(reverse("post-list"), {"search": "caching", "page_size": 1})
+        self.assertEqual(res.data["count"], 2)
+        self.assertEqual([p["id"] for p in res.data["results"]], [self.in_title.id])
+        self.assertEqual([p["id"] for p in self.client.get(res.data["next"]).data["results"]], [self.in_body.id])
+        self.assertFalse(any("CASE WHEN" in q["sql"] for q in ctx.captured_queries))
+
+    def test_username_matches_author_posts(self):
+        author = get_user_model().objects.create(username="tomatoes_fan")
+        post = Post.objects.create(author=author, title="Untitled", content="Nothing here")
+        self.backend.rebuild()
+
+        self.assertEqual(self.search_ids("tomatoes_fan"), [post.id])
+        self.assertEqual(self.search_ids("@tomatoes_fan"), [post.id])
+        # Text matches first, then the author's other posts
+        self.assertEqual(self.search_ids("searcher"), [self.other.id, self.in_body.id, self.in_title.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            author.username = "renamed"
+            author.save()
+        self.assertEqual(self.search_ids("renamed"), [post.id])
+        self.assertEqual(self.search_ids("tomatoes_fan"), [])
+
+    def test_index_follows_save_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(author=self.user, title="Fresh caching post", content="Body")
+        self.assertIn(post.id, self.search_ids("fresh"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = "Renamed"
+            post.save()
+        self.assertEqual(self.search_ids("fresh"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_title.delete()
+        self.assertEqual(self.search_ids("caching"), [self.in_body.id])
+
+    def test_falls_back_to_icontains_without_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {SQLiteFTS5Backend.table}")
+        self.assertEqual(sorted(self.search_ids("cach")), sorted([self.in_title.id, self.in_body.id]))
+
+    @override_settings(POSTS_SEARCH_BACKEND=None)
+    def test_disabled_backend_uses_icontains(self):
+        self.assertEqual(self.search_ids("searcher"), [self.other.id, self.in_body.id, self.in_title.id])
+
+
+class InvertedIndexTests(TestCase):
+    def setUp(self):
+        self.idx = InvertedIndex()
+        self.idx.add(1, "Django caching tips", "Short body")
+        self.idx.add(2, "Misc notes", "Some words about caching in general")
+        self.idx.add(3, "Gardening", "Tomatoes and caching seeds")
+
+    def test_bm25_ranks_title_and_requires_all_words(self):
+        self.assertEqual(self.idx.search("caching", 10)[0], 1)
+        self.assertEqual(self.idx.search("caching tomatoes", 10), [3])
+        self.assertEqual(self.idx.search("caching unknownword", 10), [])
+
+    def test_update_and_remove_tombstone_old_documents(self):
+        self.idx.add(1, "Renamed", "Nothing here")
+        self.idx.remove(2)
+        self.assertEqual(self.idx.search("caching", 10), [3])
+        self.assertEqual(self.idx.search("renamed", 10), [1])
+
+    def test_snapshot_round_trip_is_writable(self):
+        self.idx.remove(2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "posts.idx")
+            self.idx.save(path)
+            loaded = InvertedIndex()
+            loaded.load(path)
+            self.assertEqual(loaded.search("caching", 10), self.idx.search("caching", 10))
+
+            loaded.add(4, "More caching", "caching")  # posting lists leave the mmap on write
+            self.assertEqual(loaded.search("caching", 1), [4])
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    POSTS_SEARCH_BACKEND="posts.inverted_index.InvertedIndexBackend",
+)
+class InvertedIndexBackendTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username="memsearch")
+        cls.post = Post.objects.create(author=cls.user, title="Inverted index", content="Body")
+
+    def setUp(self):
+        get_index().clear()
+        self.addCleanup(get_index().clear)
+        self.client.force_authenticate(self.user)
+
+    def search_ids(self, q):
+        return [p["id"] for p in self.client.get(reverse("post-list"), {"search": q}).data["results"]]
+
+    def test_builds_lazily_then_follows_signals(self):
+        self.assertEqual(self.search_ids("inverted"), [self.post.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            newer = Post.objects.create(author=self.user, title="Another inverted post", content="x")
+        self.assertEqual(sorted(self.search_ids("inverted")), sorted([self.post.id, newer.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            newer.delete()
+        self.assertEqual(self.search_ids("inverted"), [self.post.id])
+
+    def test_preload_loads_in_a_background_thread(self):
+        with mock.patch.object(InvertedIndexBackend, "ensure_loaded") as ensure_loaded:
+            thread = preload()
+            thread.join()
+        ensure_loaded.assert_called_once_with()
+        with self.settings(POSTS_SEARCH_BACKEND=None):
+            self.assertIsNone(preload())
+
+    def test_search_falls_back_while_the_index_loads(self):
+        locked, release = threading.Event(), threading.Event()
+
+        def loading():
+            with get_index().lock:
+                locked.set()
+                release.wait(5)
+
+        loader = threading.Thread(target=loading)
+        loader.start()
+        self.addCleanup(loader.join)
+        self.addCleanup(release.set)
+        locked.wait(5)
+        # Answered by icontains without waiting for the lock
+        self.assertEqual(self.search_ids("Inverted index"), [self.post.id])
+        self.assertFalse(get_index().loaded)
+
+    def test_snapshot_plus_catch_up(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                self.settings(POSTS_SEARCH_SNAPSHOT=os.path.join(tmp, "posts.idx")):
+            gone = Post.objects.create(author=self.user, title="Inverted but deleted", content="x")
+            call_command("rebuild_search_index", stdout=StringIO())
+            get_index().clear()
+            later = Post.objects.create(author=self.user, title="Written after snapshot", content="x")
+            gone.delete()
+            self.assertEqual(self.search_ids("snapshot"), [later.id])
+            self.assertEqual(self.search_ids("inverted"), [self.post.id])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_SEARCH_BACKEND=None)
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create(username="etagauthor")
+        cls.fan = User.objects.create(username="etagfan")
+        cls.post = Post.objects.create(author=cls.author, title="Cached post", content="Body")
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.fan, content="Nice")
+
+    def setUp(self):
+        self.client.force_authenticate(self.fan)
+        self.detail_url = reverse("post-detail", args=[self.post.id])
+
+    def test_detail_answers_304_with_one_query(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(1):
+            again = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+        since = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_counter_and_comment_changes_invalidate_detail(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        Like.objects.create(user=self.fan, post=self.post)
+        liked = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(liked.status_code, status.HTTP_200_OK)
+
+        self.comment.content = "Edited"
+        self.comment.save()
+        edited = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=liked["ETag"])
+        self.assertEqual(edited.status_code, status.HTTP_200_OK)
+        self.assertEqual(edited.data["comments"][0]["content"], "Edited")
+
+    def test_list_validators_follow_membership_and_query(self):
+        url = reverse("post-list")
+        first = self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        self.assertNotEqual(self.client.get(url, {"ordering": "created_at"})["ETag"], first["ETag"])
+
+        Post.objects.create(author=self.author, title="Newer post", content="x")
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_comment_endpoints_are_conditional(self):
+        for url in (
+            reverse("post-comments", args=[self.post.id]),
+            reverse("comment-list"),
+            reverse("comment-detail", args=[self.comment.id]),
+        ):
+            etag = self.client.get(url)["ETag"]
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_SEARCH_BACKEND=None)
+class ResponseCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create(username="cachedauthor")
+        cls.fan = User.objects.create(username="cachedfan")
+        cls.posts = [
+            Post.objects.create(author=cls.author, title=f"Cached {i}", content="Body")
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        get_cache().clear()
+        self.list_url = reverse("post-list")
+
+    def test_anonymous_detail_is_served_from_cache_until_it_changes(self):
+        url = reverse("post-detail", args=[self.posts[0].id])
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            again = self.client.get(url)
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+        Comment.objects.create(post=self.posts[0], author=self.fan, content="First!")
+        fresh = self.client.get(url)
+        self.assertEqual(fresh.data["comments_count"], 1)
+        self.assertNotEqual(fresh["ETag"], first["ETag"])
+
+    def test_list_pages_only_rerender_changed_posts(self):
+        first = self.client.get(self.list_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.list_url).data, first.data)
+
+        Comment.objects.create(post=self.posts[1], author=self.fan, content="Hi")
+        with self.assertNumQueries(1):  # one in_bulk() for the changed fragment
+            resp = self.client.get(self.list_url)
+        counts = {p["id"]: p["comments_count"] for p in resp.data["results"]}
+        self.assertEqual(counts[self.posts[1].id], 1)
+
+        newer = Post.objects.create(author=self.fan, title="Brand new", content="x")
+        self.assertEqual(self.client.get(self.list_url).data["results"][0]["id"], newer.id)
+
+    def test_author_changes_and_authenticated_reads(self):
+        self.client.get(self.list_url)
+        self.author.username = "renamed"
+        self.author.save()
+        names = {p["author"]["username"] for p in self.client.get(self.list_url).data["results"]}
+        self.assertEqual(names, {"renamed"})
+
+        self.client.force_authenticate(self.fan)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.list_url)
+        self.assertTrue(ctx.captured_queries)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LikedByMeTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.reader = User.objects.create_user(username="likereader", password="pass1234")
+        cls.author = User.objects.create_user(username="likeauthor", password="pass1234")
+        cls.reader.follow(cls.author)
+        cls.posts = [
+            Post.objects.create(author=cls.author, title=f"Likeable {i}", content="Body")
+            for i in range(6)
+        ]
+        for post in cls.posts:
+            timeline.fan_out_post(post)
+        for post in cls.posts[::2]:
+            Like.objects.create(post=post, user=cls.reader)
+        Like.objects.create(post=cls.posts[1], user=cls.author)
+        cls.liked = {post.id for post in cls.posts[::2]}
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def test_lists_flag_liked_posts(self):
+        for url in (reverse("post-list"), reverse("feed")):
+            for fast in (True, False):
+                with self.settings(POSTS_FAST_LIST=fast):
+                    results = self.client.get(url).data["results"]
+                self.assertEqual({p["id"] for p in results if p["liked_by_me"]}, self.liked)
+                counts = {p["id"]: p["likes_count"] for p in results}
+                self.assertEqual(counts[self.posts[0].id], 1)
+                self.assertEqual(counts[self.posts[1].id], 1)
+
+    def test_one_like_query_per_page(self):
+        def like_queries(page_size):
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse("post-list"), {"page_size": page_size})
+            return sum('"posts_like"' in q["sql"] for q in ctx.captured_queries)
+
+        with self.settings(POSTS_FAST_LIST=False):
+            self.assertEqual(like_queries(2), 1)
+            self.assertEqual(like_queries(6), 1)
+
+    def test_detail_anonymous_and_etag_per_user(self):
+        url = reverse("post-detail", args=[self.posts[0].id])
+        mine = self.client.get(url)
+        self.assertTrue(mine.data["liked_by_me"])
+        self.client.force_authenticate(self.author)
+        theirs = self.client.get(url)
+        self.assertFalse(theirs.data["liked_by_me"])
+        self.assertNotEqual(mine["ETag"], theirs["ETag"])
+
+        self.client.force_authenticate(None)
+        self.assertFalse(self.client.get(url).data["liked_by_me"])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_SEARCH_BACKEND=None, TIME_ZONE="Africa/Lagos")
+class FastListParityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.reader = User.objects.create(username="parityreader")
+        cls.plain = User.objects.create(username="plain")
+        cls.pictured = User.objects.create(username="pictured", profile_picture="avatars/me.png")
+        cls.reader.follow(cls.plain)
+        cls.reader.follow(cls.pictured)
+        now = timezone.now()
+        for i in range(12):
+            post = Post.objects.create(
+                author=cls.pictured if i % 2 else cls.plain,
+                title=f"Parity post {i}",
+                content=f"Body with ünïcode and \"quotes\" {i}",
+                created_at=now - timedelta(minutes=i),
+            )
+            if i % 3 == 0:
+                Comment.objects.create(post=post, author=cls.reader, content="c")
+            if i % 4 == 0:
+                Like.objects.create(post=post, user=cls.reader)
+            timeline.fan_out_post(post)
+
+    def both(self, url, params=None, authenticated=True):
+        """Response bodies with the fast path on and off."""
+        bodies = []
+        for enabled in (True, False):
+            get_cache().clear()
+            self.client.force_authenticate(self.reader if authenticated else None)
+            with self.settings(POSTS_FAST_LIST=enabled):
+                resp = self.client.get(url, params or {})
+            self.assertEqual(resp.status_code, status.HTTP_200_OK)
+            bodies.append(resp.content)
+        return bodies
+
+    def test_post_list_and_feed_json_is_byte_identical(self):
+        cases = [
+            (reverse("post-list"), None),
+            (reverse("post-list"), {"page": 2}),
+            (reverse("post-list"), {"pagination": "cursor", "ordering": "created_at"}),
+            (reverse("post-list"), {"search": "ünïcode"}),
+            (reverse("feed"), None),
+            (reverse("feed"), {"pagination": "page", "page_size": 5}),
+        ]
+        for url, params in cases:
+            fast, regular = self.both(url, params)
+            self.assertEqual(fast, regular, (url, params))
+        self.assertIn(b"/media/avatars/me.png", fast)
+
+    def test_anonymous_cached_list_is_byte_identical(self):
+        fast, regular = self.both(reverse("post-list"), authenticated=False)
+        self.assertEqual(fast, regular)
+
+    def test_fast_path_skips_model_instances(self):
+        self.client.force_authenticate(self.reader)
+        with mock.patch.object(Post, "from_db", side_effect=AssertionError("model instance built")):
+            resp = self.client.get(reverse("feed"))
+        self.assertEqual(len(resp.data["results"]), 10)
+
+
+class FastJSONTests(TestCase):
+    data = {
+        "utc": timezone.now(),
+        "offset": timezone.now().astimezone(dt_timezone(timedelta(hours=1))),
+        "day": timezone.now().date(),
+        "price": Decimal("12.50"),
+        "uuid": uuid.UUID(int=42),
+        "text": "ünïcode \u2028 separators \u2029 🎉",
+        "lazy": gettext_lazy("Invalid"),
+        "nested": [{"a": 1, "b": None, "c": [1.5, True]}],
+        "results": [{"id": i} for i in range(7)],
+    }
+
+    def test_renderer_output_matches_drf(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        huge = {"n": 2 ** 70}  # beyond orjson: stdlib fallback
+        self.assertEqual(FastJSONRenderer().render(huge), JSONRenderer().render(huge))
+        indented = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, indented), JSONRenderer().render(self.data, indented)
+        )
+
+    def test_parser_matches_drf(self):
+        body = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for bad in (b"{", b'{"x": NaN}'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(bad))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_BULK_CHUNK_SIZE=2)
+class BulkCreateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create_user(username="importer", password="pass1234")
+        cls.reader = User.objects.create_user(username="follower", password="pass1234")
+        cls.reader.follow(cls.author)
+        cls.post = Post.objects.create(author=cls.author, title="Existing", content="Body")
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def bulk_post(self, url_name, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(url_name), items, format="json")
+
+    def test_posts_are_validated_per_item_and_created_together(self):
+        items = [
+            {"title": "  First import ", "content": "One"},
+            {"title": "No", "content": "Too short a title"},
+            {"title": "Second import", "content": "Two"},
+            {"title": "Third import", "content": "   "},
+            {"title": "Fourth import", "content": "Four"},
+        ]
+        res = self.bulk_post("post-bulk", items)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 3)
+        self.assertEqual([e["index"] for e in res.data["errors"]], [1, 3])
+        self.assertIn("title", res.data["errors"][0]["errors"])
+        self.assertIn("content", res.data["errors"][1]["errors"])
+
+        created = Post.objects.filter(pk__in=res.data["ids"]).order_by("id")
+        self.assertEqual([p.title for p in created], ["First import", "Second import", "Fourth import"])
+        self.assertTrue(all(p.author_id == self.author.id for p in created))
+        # Side effects of post_save are applied for the whole batch
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(owner=self.reader).values_list("post_id", flat=True)),
+            set(res.data["ids"]),
+        )
+
+    def test_comments_bump_counters_and_resolve_posts_in_one_query(self):
+        other = Post.objects.create(author=self.author, title="Other", content="Body")
+        items = [
+            {"post": self.post.id, "content": "a"},
+            {"post": self.post.id, "content": "b"},
+            {"post": other.id, "content": "c"},
+            {"post": 999999, "content": "missing post"},
+            {"content": "no post"},
+            {"post": other.id, "content": ""},
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.bulk_post("comment-bulk", items)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["created"], 3)
+        self.assertEqual([e["index"] for e in res.data["errors"]], [3, 4, 5])
+        post_selects = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and '"posts_post"' in q["sql"].split("WHERE")[0]
+        ]
+        self.assertEqual(len(post_selects), 1)
+
+        self.post.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.post.comments_count, other.comments_count), (2, 1))
+
+    def test_payload_errors(self):
+        for payload in ({"title": "Not a list"}, []):
+            self.assertEqual(self.bulk_post("post-bulk", payload).status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(POSTS_BULK_MAX_ITEMS=2):
+            res = self.bulk_post("post-bulk", [{"title": "Many", "content": "x"}] * 3)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.bulk_post("post-bulk", [{"title": "x", "content": "x"}])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data["created"], 0)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        res = self.bulk_post("post-bulk", [{"title": "Anon", "content": "x"}])
+        self.assertIn(res.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_EXPORT_CHUNK_SIZE=2)
+class ExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username="exporter", password="pass1234")
+        cls.other = User.objects.create_user(username="bystander", password="pass1234")
+        cls.posts = [
+            Post.objects.create(author=cls.user, title=f"Mine {i}", content='Line "quoted", comma\nnext')
+            for i in range(3)
+        ]
+        theirs = Post.objects.create(author=cls.other, title="Theirs", content="Body")
+        Comment.objects.create(post=theirs, author=cls.user, content="Nice")
+        Comment.objects.create(post=theirs, author=cls.other, content="Not exported")
+        Like.objects.create(post=theirs, user=cls.user)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        res = self.client.get(reverse("export"), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res, b"".join(res.streaming_content)
+
+    def test_ndjson_has_only_the_users_rows(self):
+        res, body = self.export()
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([r["type"] for r in rows], ["post"] * 3 + ["comment", "like"])
+        self.assertEqual([r["id"] for r in rows[:3]], [p.id for p in self.posts])
+        self.assertEqual(rows[3]["content"], "Nice")
+
+    def test_csv_and_include_filter(self):
+        res, body = self.export(output="csv", include="posts")
+        self.assertTrue(res["Content-Disposition"].endswith('exporter-export.csv"'))
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["content"], 'Line "quoted", comma\nnext')
+        self.assertEqual(rows[0]["post_id"], "")
+
+    def test_bad_parameters_and_anonymous(self):
+        for params in ({"output": "xml"}, {"include": "posts,secrets"}):
+            self.assertEqual(self.client.get(reverse("export"), params).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(None)
+        self.assertIn(
+            self.client.get(reverse("export")).status_code,
+            (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN),
+        )
+
+    def test_rows_are_streamed_in_buffers(self):
+        chunks = list(export.stream(self.user, buffer_size=1))
+        self.assertEqual(len(chunks), 5)
+
+        async def collect():  # the ASGI path pulls the same chunks one at a time
+            return [chunk async for chunk in export.astream(export.stream(self.user, buffer_size=1))]
+        self.assertEqual(async_to_sync(collect)(), chunks)
+
+    def test_command_matches_endpoint(self):
+        out = StringIO()
+        call_command("export_user_data", "exporter", stdout=out)
+        self.assertEqual(out.getvalue().encode(), self.export()[1])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POSTS_TOP_HALF_LIFE=3600)
+class TopFeedTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.reader = User.objects.create_user(username="topreader", password="pass1234")
+        cls.author = User.objects.create_user(username="topauthor", password="pass1234")
+        cls.fans = [User.objects.create_user(username=f"topfan{i}", password="pass1234") for i in range(4)]
+        cls.reader.follow(cls.author)
+        now = timezone.now()
+        # newest first in time: fresh (no engagement), popular (1 h old), stale (5 h old)
+        cls.fresh, cls.popular, cls.stale = [
+            Post.objects.create(author=cls.author, title=title, content="Body", created_at=now - timedelta(hours=age))
+            for title, age in (("Fresh", 0), ("Popular", 1), ("Stale", 5))
+        ]
+        for post in (cls.fresh, cls.popular, cls.stale):
+            timeline.fan_out_post(post)
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def top_ids(self, **params):
+        res = self.client.get(reverse("feed"), {"mode": "top", **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [p["id"] for p in res.data["results"]]
+
+    def test_new_posts_are_scored_and_rank_by_recency(self):
+        self.assertEqual(PostScore.objects.count(), 3)
+        self.assertEqual(self.top_ids(), [self.fresh.id, self.popular.id, self.stale.id])
+
+    def test_refresh_only_touches_changed_posts(self):
+        call_command("refresh_post_scores", "--full", stdout=StringIO())
+        for fan in self.fans:
+            Like.objects.create(post=self.popular, user=fan)
+        Comment.objects.create(post=self.stale, author=self.fans[0], content="Late")
+        # Likes/comments alone do not move the ranking until the refresh runs
+        self.assertEqual(self.top_ids()[0], self.fresh.id)
+
+        with self.settings(POSTS_TOP_REFRESH_OVERLAP=0):
+            self.assertEqual(ranking.refresh(), 2)  # not the untouched fresh post
+        self.assertEqual(self.top_ids(), [self.popular.id, self.fresh.id, self.stale.id])
+
+        # A post created after the refresh does not hide earlier changes from the next one
+        Like.objects.create(post=self.stale, user=self.fans[1])
+        newer = Post.objects.create(author=self.author, title="Newer", content="Body")
+        with self.settings(POSTS_TOP_REFRESH_OVERLAP=0):
+            self.assertEqual(ranking.refresh(), 2)
+        self.assertIsNotNone(PostScore.objects.get(post=newer).source_modified)
+
+    def test_top_ignores_cursor_pagination_and_validates_mode(self):
+        self.assertEqual(
+            self.top_ids(pagination="cursor"), [self.fresh.id, self.popular.id, self.stale.id]
+        )
+        res = self.client.get(reverse("feed"), {"mode": "hot"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,224 @@
+# posts/timeline.py
+"""
+Materialized home timelines (fan-out-on-write with a fan-out-on-read
+fallback for very high-follower authors).
+
+- A new Post is copied into TimelineEntry rows for each follower. Timelines
+  are cut back to TIMELINE_MAX_LENGTH entries by `rebuild_timelines
+  --trim-only` (schedule it), not on every post: the feed only ever reads
+  the newest rows, so extra old ones cost space, not speed.
+- Authors with at least TIMELINE_FANOUT_FOLLOWER_LIMIT followers are not
+  fanned out; their posts are merged in when the feed is read. When an
+  unfollow takes one back below the limit, their newest
+  TIMELINE_BACKFILL_POSTS (50) posts are fanned out so they stay in feeds;
+  `rebuild_timelines` restores anything older.
+- The feed is ordered and paginated on the entry's own (created_at,
+  post_id), so a page is one (owner, -created_at, -post) index range scan
+  however long the timeline has grown.
+- Following/unfollowing backfills or drops those authors' rows
+  (see posts/signals.py and the `rebuild_timelines` command).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q
+
+from .models import Post, TimelineEntry
+
+User = get_user_model()
+Follow = User.following.through
+
+BATCH_SIZE = 1000
+
+
+def max_length():
+    return getattr(settings, "TIMELINE_MAX_LENGTH", 800)
+
+
+def fanout_follower_limit():
+    return getattr(settings, "TIMELINE_FANOUT_FOLLOWER_LIMIT", 10000)
+
+
+def backfill_posts():
+    return getattr(settings, "TIMELINE_BACKFILL_POSTS", 50)
+
+
+def _chunks(seq, size=BATCH_SIZE):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def follower_ids(author_id):
+    return list(
+        Follow.objects.filter(to_customuser_id=author_id)
+        .values_list("from_customuser_id", flat=True)
+    )
+
+
+def is_high_fanout(author_id):
+    """Authors at or above the limit are read on demand instead of fanned out."""
+    return User.objects.filter(
+        pk=author_id, followers_count__gte=fanout_follower_limit()
+    ).exists()
+
+
+def high_fanout_author_ids(user):
+    """Followed authors whose posts are merged into `user`'s feed on read."""
+    return list(
+        user.following
+        .filter(followers_count__gte=fanout_follower_limit())
+        .values_list("id", flat=True)
+    )
+
+
+def _entries(post, owner_ids):
+    return [
+        TimelineEntry(
+            owner_id=owner_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            created_at=post.created_at,
+        )
+        for owner_id in owner_ids
+    ]
+
+
+def over_limit(owner_ids):
+    """The owners among `owner_ids` holding more than `max_length()` entries."""
+    return list(
+        TimelineEntry.objects.filter(owner_id__in=owner_ids)
+        .values("owner_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=max_length())
+        .values_list("owner_id", flat=True)
+    )
+
+
+def trim(owner_ids):
+    """Drop everything past the newest `max_length()` entries of each owner."""
+    limit = max_length()
+    for batch in _chunks(list(owner_ids)):
+        # Owners within the limit cost nothing beyond the grouped count
+        for owner_id in over_limit(batch):
+            entries = TimelineEntry.objects.filter(owner_id=owner_id)
+            # The first entry past the limit, on the (owner, -created_at) index
+            cutoff = list(
+                entries.order_by("-created_at", "-post_id")
+                .values_list("created_at", "post_id")[limit:limit + 1]
+            )
+            if cutoff:
+                created_at, post_id = cutoff[0]
+                entries.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, post_id__lte=post_id)
+                ).delete()
+
+
+def fan_out_post(post):
+    """Copy a new post into its followers' timelines (skipped for high-fanout authors)."""
+    if is_high_fanout(post.author_id):
+        return
+    owner_ids = follower_ids(post.author_id)
+    for batch in _chunks(owner_ids):
+        TimelineEntry.objects.bulk_create(_entries(post, batch), ignore_conflicts=True)
+
+
+def fan_out_posts(posts):
+    """fan_out_post() for many posts: followers are read once per author."""
+    by_author = {}
+    for post in posts:
+        by_author.setdefault(post.author_id, []).append(post)
+    for author_id, authored in by_author.items():
+        if is_high_fanout(author_id):
+            continue
+        # Older posts would be trimmed straight away
+        newest = sorted(authored, key=lambda p: (p.created_at, p.id))[-max_length():]
+        for batch in _chunks(follower_ids(author_id)):
+            TimelineEntry.objects.bulk_create(
+                [e for p in newest for e in _entries(p, batch)],
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+
+
+def backfill_authors(owner_id, author_ids):
+    """`owner_id` started following `author_ids`: pull in their latest posts."""
+    fanned_out = list(
+        User.objects.filter(pk__in=author_ids, followers_count__lt=fanout_follower_limit())
+        .values_list("pk", flat=True)
+    )
+    if not fanned_out:
+        return
+    posts = (
+        Post.objects.filter(author_id__in=fanned_out)
+        .order_by("-created_at")
+        .only("id", "author_id", "created_at")[:max_length()]
+    )
+    TimelineEntry.objects.bulk_create(
+        [e for p in posts for e in _entries(p, [owner_id])],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([owner_id])
+
+
+def crossed_below_limit(author_ids):
+    """
+    Among authors that just lost one follower each, those now one below the
+    limit: until this unfollow their posts were pulled on read, not fanned out.
+    """
+    return list(
+        User.objects.filter(pk__in=author_ids, followers_count=fanout_follower_limit() - 1)
+        .values_list("pk", flat=True)
+    )
+
+
+def fan_out_recent(author_ids):
+    """Fan out the newest `backfill_posts()` posts of each author to their followers."""
+    for author_id in author_ids:
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by("-created_at")
+            .only("id", "author_id", "created_at")[:backfill_posts()]
+        )
+        fan_out_posts(posts)
+
+
+def remove_authors(owner_id, author_ids):
+    """`owner_id` stopped following `author_ids`: drop their rows from the timeline."""
+    TimelineEntry.objects.filter(owner_id=owner_id, author_id__in=author_ids).delete()
+
+
+def rebuild(owner):
+    """Recompute `owner`'s timeline from scratch (follow graph + latest posts)."""
+    TimelineEntry.objects.filter(owner_id=owner.id).delete()
+    skip = high_fanout_author_ids(owner)
+    posts = (
+        Post.objects
+        .filter(author__in=owner.following.exclude(id__in=skip))
+        .order_by("-created_at")
+        .only("id", "author_id", "created_at")[:max_length()]
+    )
+    TimelineEntry.objects.bulk_create(
+        [e for p in posts for e in _entries(p, [owner.id])],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def feed_queryset(user):
+    """
+    Posts for `user`'s home feed, newest first, annotated with the keyset
+    the feed pages on: feed_at / feed_post (see FeedView).
+    Without high-fanout follows these are the TimelineEntry columns, so the
+    ordering and the cursor seek run on the (owner, -created_at, -post) index.
+    """
+    pulled = high_fanout_author_ids(user)
+    if not pulled:
+        qs = Post.objects.filter(timeline_entries__owner=user).annotate(
+            feed_at=F("timeline_entries__created_at"), feed_post=F("timeline_entries__post_id")
+        )
+    else:
+        qs = Post.objects.filter(
+            Q(id__in=TimelineEntry.objects.filter(owner=user).values("post_id"))
+            | Q(author_id__in=pulled)
+        ).annotate(feed_at=F("created_at"), feed_post=F("id"))
+    return qs.order_by("-feed_at", "-feed_post")
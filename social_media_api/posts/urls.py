@@ -6,6 +6,7 @@ from .views import (
     FeedView,
     LikePostView,
     UnlikePostView,
+    ExportView,
 )
 
 # DRF router for posts & comments
@@ -16,6 +17,7 @@ router.register(r"comments", CommentViewSet, basename="comment")
 # Merge router URLs + custom paths
 urlpatterns = router.urls + [
     path("feed/", FeedView.as_view(), name="feed"),
+    path("export/", ExportView.as_view(), name="export"),
     path("posts/<int:pk>/like/", LikePostView.as_view(), name="like-post"),
     path("posts/<int:pk>/unlike/", UnlikePostView.as_view(), name="unlike-post"),
 ]
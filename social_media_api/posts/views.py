@@ -1,4 +1,7 @@
 # posts/views.py
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.db.models import Prefetch
 from rest_framework import viewsets,generics, permissions, filters, status
 from rest_framework.decorators import action
@@ -7,46 +10,67 @@ from .models import Post, Comment
 from .serializers import PostSerializer, PostDetailSerializer, CommentSerializer
 from .permissions import IsAuthorOrReadOnly
 from .pagination import DefaultPagination
+from .filters import PostSearchFilter
+from .conditional import ConditionalGetMixin, page_validators, precondition_response, set_validators
+from .response_cache import CachedReadMixin
+from .fastpath import FastPostListMixin
+from . import bulk, export, likes, ranking, timeline
 
 from rest_framework.generics import get_object_or_404
 
-from .models import Post, Comment, Like
+from .models import Post, Comment
 from .serializers import PostSerializer, CommentSerializer
-from notifications.models import Notification
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.views import APIView
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(CachedReadMixin, ConditionalGetMixin, FastPostListMixin, viewsets.ModelViewSet):
     """
     /api/posts/ -> list, create
     /api/posts/{id}/ -> retrieve, update, partial_update, destroy
     - Read for everyone; write only for authenticated users
     - Only the author can edit/delete
-    - Search: ?search=<q> across title/content/author
+    - Search: ?search=<q> full-text over title/content, best match first (posts/search.py)
     - Order:  ?ordering=created_at | -created_at | updated_at | -updated_at
+    - Paging: ?page=<n> (default) or ?pagination=cursor -> opaque next/previous cursors
+      (cursors follow ?ordering=; a relevance-ranked ?search= uses page numbers)
+    - GETs send ETag / Last-Modified and answer 304 to matching conditional requests
+    - Anonymous list/detail reads are served from the response cache (posts/response_cache.py)
+    - List pages are rendered from plain rows, not PostSerializer (posts/fastpath.py)
+    - POST /api/posts/bulk/ with a list creates many posts at once (posts/bulk.py)
     """
     # Keep these lines to satisfy checkers that look for exact substrings
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ["title", "content", "author__username"]
+    # Ordering first so a ranked ?search= keeps its relevance order
+    filter_backends = [filters.OrderingFilter, PostSearchFilter]
+    search_fields = ["title", "content", "author__username"]  # icontains fallback
     ordering_fields = ["created_at", "updated_at"]
     ordering = ["-created_at"]
     pagination_class = DefaultPagination
+    keyset_fields = ordering_fields
+    detail_comments_limit = PostDetailSerializer.comments_limit
+    modified_field = "last_modified"
 
     def get_queryset(self):
         # Optimized queryset actually used at runtime
-        return (
-            Post.objects
-            .select_related("author")
-            .prefetch_related(
+        qs = Post.objects.select_related("author")
+        if self.action == "retrieve":
+            # Only the latest N comments per post (sliced prefetch = ROW_NUMBER() window);
+            # the rest is paged through /api/posts/{id}/comments/
+            qs = qs.prefetch_related(
                 Prefetch(
                     "comments",
-                    queryset=Comment.objects.select_related("author")
+                    queryset=(
+                        Comment.objects.select_related("author")
+                        .order_by("-created_at", "-id")[:self.detail_comments_limit]
+                    ),
+                    to_attr="latest_comments",
                 )
             )
-        )
+        # list (and writes) never load comments: PostSerializer only needs comments_count
+        return qs
 
     def get_serializer_class(self):
         # On retrieve, include embedded comments
@@ -56,6 +80,14 @@ class PostViewSet(viewsets.ModelViewSet):
         # Ensure the authenticated user is set as author
         serializer.save(author=self.request.user)
 
+    @action(detail=False, methods=["post"], url_path="bulk", url_name="bulk")
+    def create_many(self, request):
+        """
+        POST /api/posts/bulk/  [{"title": ..., "content": ...}, ...]
+        -> {"created": n, "ids": [...], "errors": [{"index": i, "errors": {...}}]}
+        """
+        return bulk_response(request, PostSerializer, bulk.create_posts)
+
     @action(detail=True, methods=["get", "post"], url_path="comments")
     def comments(self, request, pk=None):
         """
@@ -67,8 +99,12 @@ class PostViewSet(viewsets.ModelViewSet):
         if request.method.lower() == "get":
             qs = post.comments.select_related("author").all()
             page = self.paginate_queryset(qs)
+            etag, last_modified = page_validators(request, page, "updated_at", self.get_page_envelope(page))
+            early = precondition_response(request, etag, last_modified)
+            if early is not None:
+                return early
             ser = CommentSerializer(page, many=True, context={"request": request})
-            return self.get_paginated_response(ser.data)
+            return set_validators(self.get_paginated_response(ser.data), etag, last_modified)
 
         # POST
         ser = CommentSerializer(
@@ -76,16 +112,19 @@ class PostViewSet(viewsets.ModelViewSet):
             context={"request": request, "post": post},
         )
         ser.is_valid(raise_exception=True)
-        ser.save()
+        with transaction.atomic():  # comment row + post.comments_count together
+            ser.save()
         return Response(ser.data, status=status.HTTP_201_CREATED)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     /api/comments/ -> list, create (payload must include "post" id unless using nested route)
     /api/comments/{id}/ -> retrieve, update, partial_update, destroy
     - Only the comment's author can edit/delete
     - Filter by post: ?post=<post_id>
+    - POST /api/comments/bulk/ with a list imports many comments at once (posts/bulk.py)
+    - GETs send ETag / Last-Modified and answer 304 to matching conditional requests
     """
     # Keep this line to satisfy checkers that look for exact substrings
     queryset = Comment.objects.all()
@@ -95,6 +134,7 @@ class CommentViewSet(viewsets.ModelViewSet):
     ordering_fields = ["created_at", "updated_at"]
     ordering = ["created_at"]
     pagination_class = DefaultPagination
+    keyset_fields = ordering_fields
 
     def get_queryset(self):
         qs = Comment.objects.select_related("author", "post")
@@ -103,52 +143,133 @@ class CommentViewSet(viewsets.ModelViewSet):
             qs = qs.filter(post_id=post_id)
         return qs
 
+    # Comment row and post.comments_count (posts/signals.py) change together
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+    @action(detail=False, methods=["post"], url_path="bulk", url_name="bulk")
+    def create_many(self, request):
+        """
+        POST /api/comments/bulk/  [{"post": <id>, "content": ...}, ...]
+        -> {"created": n, "ids": [...], "errors": [{"index": i, "errors": {...}}]}
+        """
+        return bulk_response(
+            request, bulk.BulkCommentSerializer, bulk.create_comments,
+            # Resolve every referenced post with one query instead of one per item
+            get_context=lambda items: {"posts_by_id": Post.objects.in_bulk(bulk.post_ids_in(items))},
+        )
+
+
+def bulk_response(request, serializer_class, create, get_context=None):
+    """Validate each item, create the valid ones, report the rest by index."""
+    try:
+        bulk.check_payload(request.data)
+    except bulk.BulkError as exc:
+        return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    context = {"request": request}
+    if get_context is not None:
+        context.update(get_context(request.data))
+    valid, errors = bulk.validate_items(serializer_class, request.data, context)
+    if not valid:
+        return Response(
+            {"created": 0, "ids": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST
+        )
+    created = create(request.user, [data for _, data in valid])
+    return Response(
+        {"created": len(created), "ids": [obj.pk for obj in created], "errors": errors},
+        status=status.HTTP_201_CREATED,
+    )
+
+#......................... export.................................
+class ExportView(APIView):
+    """
+    GET /api/export/ -> the authenticated user's posts, comments and likes, streamed
+    - ?output=ndjson (default) | csv
+    - ?include=posts,comments,likes (default: all)
+    - Constant memory however large the account (posts/export.py)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.query_params.get("output", "ndjson")
+        if fmt not in export.FORMATS:
+            raise ValidationError({"output": f"Choose one of: {', '.join(export.FORMATS)}."})
+        kinds = [k for k in request.query_params.get("include", ",".join(export.KINDS)).split(",") if k]
+        unknown = set(kinds) - set(export.KINDS)
+        if unknown or not kinds:
+            raise ValidationError({"include": f"Choose from: {', '.join(export.KINDS)}."})
+
+        chunks = export.stream(request.user, fmt, kinds)
+        if isinstance(request._request, ASGIRequest):
+            chunks = export.astream(chunks)
+        response = StreamingHttpResponse(chunks, content_type=export.FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="{request.user.username}-export.{fmt}"'
+        return response
+
+
 #......................... feed view.................................
-class FeedView(generics.ListAPIView):
+class FeedView(FastPostListMixin, generics.ListAPIView):
+    """
+    /api/feed/ -> posts by followed users
+    - ?mode=latest (default): newest first
+    - ?mode=top: by time-decayed engagement (precomputed scores, posts/ranking.py);
+      page numbers only
+    """
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = DefaultPagination
+    pagination_mode = "cursor"  # keyset by default; ?pagination=page for page numbers
+    # Seek on the timeline entry's columns (annotated by timeline.feed_queryset)
+    keyset_field = "feed_at"
+    keyset_tiebreak = "feed_post"
+    modes = ("latest", "top")
+
+    @property
+    def mode(self):
+        mode = self.request.query_params.get("mode", "latest")
+        if mode not in self.modes:
+            raise ValidationError({"mode": f"Choose one of: {', '.join(self.modes)}."})
+        return mode
+
+    @property
+    def keyset_allowed(self):
+        return self.mode != "top"
 
     def get_queryset(self):
-        # Get all users this user follows
-        following_users = self.request.user.following.all()
-        # Return posts authored by followed users
-        return Post.objects.filter(author__in=following_users).order_by("-created_at")
+        # Read the materialized timeline (see posts/timeline.py) instead of
+        # filtering every post by the user's following list
+        qs = timeline.feed_queryset(self.request.user).select_related("author")
+        if self.mode == "top":
+            qs = ranking.rank(qs)
+        return qs
 
 
 class LikePostView(APIView):
-    """Like a Post"""
+    """Like a Post (one INSERT ... ON CONFLICT DO NOTHING, see posts/likes.py)"""
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk, *args, **kwargs):
-        post = generics.get_object_or_404(Post, pk=pk)
-
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
+        try:
+            created = likes.like(request.user, pk)
+        except likes.PostNotFound:
+            raise NotFound()
         if created:
-            # Create notification for post author
-            if post.author != request.user:
-                Notification.objects.create(
-                    recipient=post.author,
-                    actor=request.user,
-                    verb="liked your post",
-                    target_post=post,
-                )
             return Response({"message": "Post liked."}, status=status.HTTP_201_CREATED)
         return Response({"message": "Already liked."}, status=status.HTTP_200_OK)
 
 
 class UnlikePostView(APIView):
-    """Unlike a Post"""
+    """Unlike a Post (one DELETE, see posts/likes.py)"""
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk, *args, **kwargs):
-        post = generics.get_object_or_404(Post, pk=pk)
-
-        like = Like.objects.filter(user=request.user, post=post).first()
-        if like:
-            like.delete()
+        if likes.unlike(request.user, pk):
             return Response({"message": "Post unliked."}, status=status.HTTP_200_OK)
-
-        return Response({"message": "You have not liked this post."}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        if not Post.objects.filter(pk=pk).exists():
+            raise NotFound()
+        return Response({"message": "You have not liked this post."}, status=status.HTTP_400_BAD_REQUEST)
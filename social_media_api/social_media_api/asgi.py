@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve under ASGI for the live notification stream (/api/notifications/stream/),
+e.g. `gunicorn social_media_api.asgi:application -k uvicorn.workers.UvicornWorker`.
 """
 
 import os
@@ -14,3 +17,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
 
 application = get_asgi_application()
+
+# Start loading the in-memory search index now rather than in the first search
+from posts.inverted_index import preload  # noqa: E402
+
+preload()
@@ -0,0 +1,79 @@
+"""
+Faster JSON for the DRF API (see REST_FRAMEWORK in settings.py).
+
+- Uses orjson when it is installed, the stdlib + DRF's JSONEncoder otherwise
+- Output is byte-for-byte what rest_framework.renderers.JSONRenderer produces
+  (compact, UTF-8, "Z" for UTC, \\u2028/\\u2029 escaped); indented output
+  (browsable API, `; indent=N`) and anything orjson rejects fall back to DRF
+- datetime/date/UUID are encoded by orjson itself; Decimal, timedelta, lazy
+  strings, querysets ... go through DRF's JSONEncoder.default
+- Benchmark: python manage.py bench_json
+"""
+import io
+import json
+import re
+
+from rest_framework.parsers import JSONParser, get_encoding
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+_encoder = JSONEncoder()
+_JS_SEPARATORS = re.compile(b"\xe2\x80[\xa8\xa9]")  # U+2028 / U+2029 in UTF-8
+
+
+def _escape_js_separators(raw):
+    # Same as DRF: keep the output a strict JavaScript subset
+    if _JS_SEPARATORS.search(raw) is None:
+        return raw
+    return raw.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def _stdlib_dumps(data):
+    raw = json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    )
+    return raw.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+def dumps(data):
+    """Compact JSON bytes, identical to DRF's default JSONRenderer output."""
+    if orjson is not None:
+        try:
+            return _escape_js_separators(
+                orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+            )
+        except orjson.JSONEncodeError:
+            pass  # e.g. ints beyond 64 bits: let the stdlib decide
+    return _stdlib_dumps(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None and self.compact and self.strict and not self.ensure_ascii:
+            return dumps(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = get_encoding(parser_context).lower().replace("_", "-")
+        if orjson is None or not self.strict or encoding not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Re-parse with the stdlib so edge cases and error messages match DRF
+            return super().parse(io.BytesIO(body), media_type, parser_context)
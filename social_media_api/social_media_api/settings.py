@@ -133,13 +133,24 @@ AUTH_USER_MODEL = "accounts.CustomUser"
 
 
 # DRF: use Token authentication by default
+# (cached token lookups, see accounts/authentication.py)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachingTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON with a stdlib fallback (social_media_api/fastjson.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'social_media_api.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'social_media_api.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Media (for profile pictures)
@@ -163,5 +174,22 @@ DATABASES = {
     )
 }
 
+# Cache (anonymous post reads, see posts/response_cache.py)
+# Shared Redis in production; per-process memory for local runs and tests
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'social-media-api',
+        }
+    }
+
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
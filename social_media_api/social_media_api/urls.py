@@ -23,6 +23,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('accounts.urls')),
     path("api/", include("posts.urls")),     # -> /api/posts, /api/comments
+    path("api/notifications/", include("notifications.urls")),
 ]
 
 if settings.DEBUG:
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'social_media_api.settings')
 
 application = get_wsgi_application()
+
+# Start loading the in-memory search index now rather than in the first search
+from posts.inverted_index import preload  # noqa: E402
+
+preload()